@@ -0,0 +1,128 @@
+import hashlib
+
+from flask import abort, jsonify, request
+import numpy as np
+
+from app import app
+from export import parse_horizons, valid_horizon
+from load_tables import category_names, tasks
+from series import MAX_HORIZON, current, dataset_for
+
+API_PREFIX = app.config.routes_pathname_prefix + 'api/v1/'
+
+#Most queries accepted in one batch request
+MAX_BATCH = 10000
+
+#ETag of a response: the dataset version plus whatever else selects the data
+def make_etag(dataset, *parts):
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+    return '{}-{}'.format(dataset.version, digest)
+
+#Answers a request whose ETag the client already holds without computing anything
+#Compared weakly, since compressed responses carry the ETag as a weak one
+def not_modified(etag):
+    if request.if_none_match.contains_weak(etag):
+        response = app.server.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+#Adds caching headers; clients and proxies may keep the response but must revalidate it
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+#JSON can't hold NaN, so months without a value become null
+def to_json_list(values):
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), None, values).tolist()
+
+#Lists every registered category; months are given for those already loaded
+@app.server.route(API_PREFIX + 'categories')
+def api_categories():
+    dataset = current()
+    etag = make_etag(dataset, 'categories')
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    categories = []
+    for task in tasks:
+        category = {'category': task.name, 'loaded': task.name in dataset.arrays, 'earliest_year': task.earliest_year}
+        if category['loaded']:
+            category['first_month'] = str(dataset.row_months[task.name][0])
+            category['last_month'] = str(dataset.row_months[task.name][-1])
+            category['earliest_year'] = int(dataset.row_years[task.name][0])
+        category['precomputed_horizons'] = MAX_HORIZON
+        categories.append(category)
+    return with_etag(jsonify({'version': dataset.version, 'categories': categories}), etag)
+
+#Compounded series of one category for the given horizons and year range
+#e.g. /api/v1/series?category=Healthcare&horizons=1,5,10&start=1990&end=2023
+@app.server.route(API_PREFIX + 'series')
+def api_series():
+    data_source = request.args.get('category', 'Headline CPI')
+    if data_source not in category_names:
+        abort(404, 'unknown category')
+    dataset = dataset_for(data_source)
+    horizons = parse_horizons(request.args.get('horizons', '1'))
+    if not horizons:
+        abort(400, 'horizons must list at least one year')
+    start_year = request.args.get('start', 0, type=int)
+    end_year = request.args.get('end', 9999, type=int)
+
+    etag = make_etag(dataset, 'series', data_source, horizons, start_year, end_year)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    rows = dataset.year_slice(data_source, start_year, end_year)
+    return with_etag(jsonify({
+        'version': dataset.version,
+        'category': data_source,
+        'dates': dataset.row_months[data_source][rows].astype(str).tolist(),
+        'series': {str(years): to_json_list(dataset.get_horizon(data_source, years)[rows]) for years in horizons}
+    }), etag)
+
+#Looks up many single values at once
+#Body: {"queries": [{"category": "Headline CPI", "horizon": 5, "date": "1990-03"}, ...]}
+@app.server.route(API_PREFIX + 'batch', methods=['POST'])
+def api_batch():
+    body = request.get_json(silent=True) or {}
+    queries = body.get('queries')
+    if not isinstance(queries, list):
+        abort(400, 'expected a JSON body with a "queries" list')
+    if len(queries) > MAX_BATCH:
+        abort(400, 'at most {} queries per batch'.format(MAX_BATCH))
+
+    #Loads every category the batch asks for before answering any of it
+    dataset = current()
+    requested = {str(query.get('category')) for query in queries if isinstance(query, dict)}
+    for data_source in requested.intersection(category_names):
+        dataset = dataset_for(data_source)
+
+    etag = make_etag(dataset, 'batch', request.get_data())
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    results = []
+    for query in queries:
+        result = dict(query) if isinstance(query, dict) else {'query': query}
+        try:
+            data_source = query['category']
+            years = int(query['horizon'])
+            if data_source not in dataset.data_sources or not valid_horizon(years):
+                raise ValueError
+            pos = dataset.month_position(data_source, query['date'])
+        except (KeyError, TypeError, ValueError):
+            result['error'] = 'needs a known category, a horizon of at least 1 and a YYYY-MM date'
+            results.append(result)
+            continue
+
+        value = None if pos is None else dataset.get_horizon(data_source, years)[pos]
+        result['value'] = None if value is None or np.isnan(value) else float(value)
+        results.append(result)
+
+    return with_etag(jsonify({'version': dataset.version, 'results': results}), etag)
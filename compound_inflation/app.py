@@ -2,9 +2,9 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import html
 
-from components import (about_section, control_center, desc_table,
-download_link, github_link, modified_start_year_store, plot_legend, storage,
-visibility_store)
+from components import (about_section, comparison_section, control_center, desc_table,
+download_link, figure_request, github_link, modified_start_year_store, plot_legend, plot_width_store,
+resolution_request, storage, visibility_store)
 
 app = dash.Dash(__name__)
 server=app.server
@@ -19,11 +19,15 @@ app.layout = dbc.Container(
                 control_center,
                 plot_legend,
                 download_link,
+                comparison_section,
                 about_section,
                 desc_table,
                 github_link,
                 # Storage items aren't displayed explicitly
+                figure_request,
                 modified_start_year_store,
+                plot_width_store,
+                resolution_request,
                 visibility_store,
                 storage
             ],
@@ -0,0 +1,249 @@
+// Prebuilt series fetched from the assets folder, kept for the life of the page
+const prebuiltSeries = {manifest: null, series: {}};
+
+// The manifest of the prebuilt series, or null when none were built; fetched once per page
+function loadManifest() {
+    if (!prebuiltSeries.manifest) {
+        prebuiltSeries.manifest = fetch('assets/series/manifest.json', {cache: 'no-cache'}).then(function(response) {
+            return response.ok ? response.json() : null;
+        }).catch(function() {
+            return null;
+        });
+    }
+    return prebuiltSeries.manifest;
+}
+
+// Dates and values of one prebuilt line; version folders never change, so each file is fetched once
+function loadSeries(manifest, dataSource, years) {
+    const url = 'assets/series/' + manifest.base + manifest.categories[dataSource] + '/' + years + '.json';
+    if (!prebuiltSeries.series[url]) {
+        prebuiltSeries.series[url] = fetch(url).then(function(response) {
+            if (!response.ok) {
+                throw new Error(url + ' answered ' + response.status);
+            }
+            return response.json();
+        }).then(function(payload) {
+            // Months are counted from the first one; dates are written like the server's so year ranges compare as text
+            const start = payload.start.split('-').map(Number);
+            const x = payload.values.map(function(value, i) {
+                const month = start[0] * 12 + start[1] - 1 + (payload.months ? payload.months[i] : i);
+                return String(Math.floor(month / 12)).padStart(4, '0') + '-' + String(month % 12 + 1).padStart(2, '0') + '-01';
+            });
+            return {x: x, y: payload.values};
+        });
+        // A failed fetch is tried again next time
+        prebuiltSeries.series[url].catch(function() {
+            delete prebuiltSeries.series[url];
+        });
+    }
+    return prebuiltSeries.series[url];
+}
+
+// Same colors as utils.get_distinct_colors
+function distinctColors(n) {
+    const colors = [];
+    for (let i = 0; i < n; i++) {
+        colors.push('hsl(' + Math.trunc((i * 137.5 + 240) % 360) + ', 50%, 50%)');
+    }
+    return colors;
+}
+
+// Callbacks that run in the browser against data the plot already holds
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    compound: {
+        // Draws the plot from the prebuilt series, or asks the server through figure-request when they can't draw it
+        drawFromAssets: function(dataSource, storageData, visibilityData) {
+            const noUpdate = window.dash_clientside.no_update;
+            const triggered = window.dash_clientside.callback_context.triggered.map(function(trigger) {
+                return trigger.prop_id;
+            });
+            const appended = triggered.length === 1 && triggered[0] === 'storage.data' && !(storageData && storageData.reset);
+            const askServer = [noUpdate, noUpdate, {trigger: triggered.length === 1 ? triggered[0] : null, time: Date.now()}];
+
+            // Lines kept in a server session can only be read by the server
+            if (!storageData || storageData.session) {
+                return askServer;
+            }
+            const lines = storageData.reset ? [1] : (storageData.data || []);
+            const visibility = storageData.reset ? {} : (visibilityData || {});
+
+            return loadManifest().then(function(manifest) {
+                const covered = manifest && manifest.categories[dataSource] && lines.every(function(years) {
+                    return years >= 1 && years <= manifest.horizons;
+                });
+                if (!covered) {
+                    return askServer;
+                }
+                return Promise.all(lines.map(function(years) {
+                    return loadSeries(manifest, dataSource, years);
+                })).then(function(series) {
+                    const colors = distinctColors(lines.length);
+                    const points = series.reduce(function(total, line) {
+                        return total + line.x.length;
+                    }, 0);
+                    const data = series.map(function(line, i) {
+                        const name = lines[i] + ' Year';
+                        return {
+                            type: points > manifest.webgl_points ? 'scattergl' : 'scatter',
+                            x: line.x,
+                            y: line.y,
+                            mode: 'lines',
+                            name: name,
+                            line: {color: colors[i]},
+                            visible: name in visibility ? visibility[name] : true
+                        };
+                    });
+                    // Every month is drawn, so zooms and year ranges never need sharper lines from the server
+                    const layout = Object.assign({}, manifest.layout, {
+                        uirevision: dataSource,
+                        meta: {detail: ['0000-01-01', '9999-12-31']}
+                    });
+                    const figure = {data: data, layout: layout};
+                    // Adding a line leaves the legend's visibility as it is, like the server does
+                    return [figure, appended ? noUpdate : visibility, noUpdate];
+                });
+            }).catch(function() {
+                return askServer;
+            });
+        },
+
+        // Zooms the plot to the year range and fits the y axis to the visible lines inside it
+        applyYearRange: function(startYear, endYear, figure) {
+            if (!figure || !figure.data || !startYear || !endYear) {
+                return window.dash_clientside.no_update;
+            }
+
+            // Dates arrive as ISO strings, so they compare correctly as text
+            const start = String(startYear).padStart(4, '0') + '-01-01';
+            const end = String(endYear).padStart(4, '0') + '-12-31T23:59:59';
+
+            let low = Infinity;
+            let high = -Infinity;
+            figure.data.forEach(function(trace) {
+                if (trace.visible === 'legendonly' || trace.visible === false) {
+                    return;
+                }
+                for (let i = 0; i < trace.x.length; i++) {
+                    const y = trace.y[i];
+                    if (y === null || trace.x[i] < start || trace.x[i] > end) {
+                        continue;
+                    }
+                    low = Math.min(low, y);
+                    high = Math.max(high, y);
+                }
+            });
+
+            const xaxis = Object.assign({}, figure.layout.xaxis, {range: [start, end], autorange: false});
+            let yaxis = Object.assign({}, figure.layout.yaxis, {autorange: true});
+            if (low <= high) {
+                // Same headroom Plotly's autorange would leave
+                const pad = Math.max((high - low) * 0.05, 0.5);
+                yaxis = Object.assign({}, figure.layout.yaxis, {range: [low - pad, high + pad], autorange: false});
+            }
+
+            return Object.assign({}, figure, {
+                layout: Object.assign({}, figure.layout, {xaxis: xaxis, yaxis: yaxis})
+            });
+        },
+
+        // Asks the server for sharper lines when the view moves past the months the figure holds whole (layout.meta.detail)
+        requestResolution: function(relayoutData, startYear, endYear, figure) {
+            const noUpdate = window.dash_clientside.no_update;
+            const triggered = window.dash_clientside.callback_context.triggered.map(function(trigger) {
+                return trigger.prop_id;
+            });
+            const relayout = relayoutData || {};
+
+            let view = null;
+            if (triggered.indexOf('plot.relayoutData') === -1) {
+                if (startYear && endYear) {
+                    view = [String(startYear).padStart(4, '0') + '-01-01', String(endYear).padStart(4, '0') + '-12-31'];
+                }
+            } else if ('xaxis.range[0]' in relayout && 'xaxis.range[1]' in relayout) {
+                view = [relayout['xaxis.range[0]'], relayout['xaxis.range[1]']];
+            } else if (relayout['xaxis.range']) {
+                view = relayout['xaxis.range'];
+            } else if (relayout['xaxis.autorange']) {
+                view = ['0000-01-01', '9999-12-31'];
+            }
+            if (!view) {
+                return noUpdate;
+            }
+
+            // Dates compare correctly as text
+            const start = String(view[0]);
+            const end = String(view[1]);
+            const detail = figure && figure.layout && figure.layout.meta && figure.layout.meta.detail;
+            if (detail && detail[0] <= start && end <= detail[1]) {
+                return noUpdate;
+            }
+            return {start: start, end: end, time: Date.now()};
+        },
+
+        // Width of the plot in pixels, or null before it is drawn
+        measurePlot: function(plotId) {
+            const plot = document.getElementById(plotId);
+            return plot && plot.offsetWidth ? plot.offsetWidth : null;
+        },
+
+        // Hides or shows the clicked line and greys out its legend item
+        toggleVisibility: function(nClicks, figure, visibilityData, swatchStyles) {
+            const triggered = window.dash_clientside.callback_context.triggered;
+            if (!figure || !triggered.length || !triggered[0].value) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+
+            // The prop id looks like '{"index":"4 Year","type":"legend-button"}.n_clicks'
+            const propId = triggered[0].prop_id;
+            const traceName = JSON.parse(propId.slice(0, propId.lastIndexOf('.'))).index;
+
+            const visibility = Object.assign({}, visibilityData);
+            visibility[traceName] = visibility[traceName] === 'legendonly' ? true : 'legendonly';
+
+            const data = figure.data.map(function(trace) {
+                return trace.name === traceName ? Object.assign({}, trace, {visible: visibility[traceName]}) : trace;
+            });
+
+            // Buttons and swatches are listed in legend order
+            const buttons = window.dash_clientside.callback_context.inputs_list[0];
+            const buttonStyles = buttons.map(function(button) {
+                return visibility[button.id.index] === 'legendonly' ? {opacity: 0.5} : {};
+            });
+            const newSwatchStyles = buttons.map(function(button, i) {
+                return Object.assign({}, swatchStyles[i], {opacity: visibility[button.id.index] === 'legendonly' ? 0.5 : 1});
+            });
+
+            return [Object.assign({}, figure, {data: data}), visibility, buttonStyles, newSwatchStyles];
+        },
+
+        // Points the download link at the export route for the visible lines; nothing is generated until it is clicked
+        buildDownloadLink: function(startYear, endYear, dataSource, storageData, visibilityData) {
+            const visibility = visibilityData || {};
+            const params = new URLSearchParams({
+                category: dataSource,
+                start: startYear || '',
+                end: endYear || ''
+            });
+
+            if (storageData && storageData.session) {
+                // The lines are kept on the server, so send the session and the hidden lines instead
+                params.set('session', storageData.session);
+                params.set('hidden', Object.keys(visibility).filter(function(name) {
+                    return visibility[name] === 'legendonly';
+                }).map(function(name) {
+                    return parseInt(name, 10);
+                }).join(','));
+                return 'export?' + params.toString();
+            }
+
+            const lines = storageData && storageData.reset ? [1] : ((storageData && storageData.data) || []);
+            const horizons = lines.filter(function(years) {
+                return visibility[years + ' Year'] !== 'legendonly';
+            }).sort(function(a, b) {
+                return a - b;
+            });
+            params.set('horizons', horizons.join(','));
+            return 'export?' + params.toString();
+        }
+    }
+});
@@ -0,0 +1,286 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+import json
+import os
+import sys
+import tempfile
+import time
+
+#Benchmarks read the saved pages and keep a snapshot of their own, so they never touch the live site or the app's data
+#Set before the app's modules are imported, since they read these when loaded
+HERE = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault('INFLATION_SOURCE', os.path.join(HERE, 'fixtures'))
+os.environ.setdefault('SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(prefix='benchmark-'), 'snapshot.bin'))
+
+import pandas as pd
+
+import fixtures
+import load_tables
+from load_tables import category_names, fetch_pages, make_usable, process_pages, tasks
+from snapshot import MAX_HORIZON, build_arrays, map_snapshot, save_snapshot
+from utils import calculate_yoy, compound_matrix
+
+#Results are compared against this file unless another is given
+BASELINE_PATH = os.path.join(HERE, 'benchmark_baseline.json')
+
+#Runs of each timing; the best one is reported
+REPEAT = 5
+
+#Slower or bigger than this many times the baseline counts as a regression
+TOLERANCE = 1.5
+
+#Timings that moved by less than this are noise, whatever the ratio
+NOISE_SECONDS = 0.002
+
+#Delay added by the fixture server when timing the loader against a slow site
+SLOW_SITE_DELAY = 0.05
+
+#Best wall-clock seconds of a few runs of fn
+def best_time(fn, repeat=REPEAT):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+#How pages were processed before: pd.read_html builds every table on the page, in threads that share the GIL
+def read_html_in_threads(pages):
+    def process(task):
+        return make_usable(pd.read_html(StringIO(pages[task.name]))[0], task.layout)
+    with ThreadPoolExecutor() as executor:
+        return dict(zip([task.name for task in tasks], executor.map(process, tasks)))
+
+#Times a full refresh of every table; pages are downloaded once so both loaders parse the same html
+def bench_loading():
+    pages = fetch_pages()
+    fetch_seconds = best_time(fetch_pages)
+
+    old_seconds = best_time(lambda: read_html_in_threads(pages))
+    new_seconds = best_time(lambda: process_pages(pages))
+    return {
+        'pages': len(pages),
+        'html_bytes': sum(len(html) for html in pages.values()),
+        'fetch_seconds': fetch_seconds,
+        'read_html_threads_seconds': old_seconds,
+        'lxml_processes_seconds': new_seconds,
+        'parse_speedup': old_seconds / new_seconds,
+        'refresh_speedup': (fetch_seconds + old_seconds) / (fetch_seconds + new_seconds)
+    }
+
+#Everything a first start does without a snapshot: fetch, parse, precompute and save every table, then map it
+#Also timed against the fixture server with a delay on every page, and with one page failing
+def bench_cold_load():
+    path = os.path.join(tempfile.mkdtemp(prefix='benchmark-'), 'snapshot.bin')
+
+    def cold_load():
+        save_snapshot(process_pages(fetch_pages()), path)
+        map_snapshot(path)
+
+    result = {'seconds': best_time(cold_load), 'snapshot_bytes': os.path.getsize(path)}
+
+    source = load_tables.INFLATION_SOURCE
+    server, url = fixtures.start_server(load_tables.INFLATION_SOURCE, delay=SLOW_SITE_DELAY, fail=['College'])
+    try:
+        load_tables.INFLATION_SOURCE = url
+        healthy = [task for task in tasks if task.name != 'College']
+        result['slow_site_fetch_seconds'] = best_time(lambda: fetch_pages(healthy))
+
+        #How long until a failing page surfaces as an error
+        start = time.perf_counter()
+        try:
+            fetch_pages()
+        except Exception as error:
+            result['failing_page_error'] = type(error).__name__
+        result['failing_page_seconds'] = time.perf_counter() - start
+    finally:
+        load_tables.INFLATION_SOURCE = source
+        server.shutdown()
+    return result
+
+#Compounds every category over horizons 1 through MAX_HORIZON, one horizon at a time and as the whole matrix
+def bench_compounding():
+    tables = process_pages(fetch_pages())
+    result = {}
+    for name, df in tables.items():
+        rates = df['1 Year'].to_numpy(dtype=float)
+        result[name] = {
+            'months': len(rates),
+            'calculate_yoy_seconds': best_time(lambda: [calculate_yoy(df, years) for years in range(1, MAX_HORIZON + 1)], 1),
+            'compound_matrix_seconds': best_time(lambda: compound_matrix(rates, MAX_HORIZON)),
+            'build_arrays_seconds': best_time(lambda: build_arrays(df))
+        }
+    return result
+
+#Output key Dash registered the named callback function under
+def callback_output(app, function_name):
+    for output, spec in app.callback_map.items():
+        if getattr(spec.get('callback'), '__name__', None) == function_name:
+            return output
+    raise KeyError(function_name)
+
+#Body of a request the Dash renderer would send to run the named callback
+#values maps 'id.property' to the value the browser holds
+def callback_request(app, function_name, values, changed):
+    output = callback_output(app, function_name)
+    spec = app.callback_map[output]
+    if output.startswith('..'):
+        outputs = [dict(zip(('id', 'property'), part.split('@')[0].rsplit('.', 1))) for part in output[2:-2].split('...')]
+    else:
+        outputs = dict(zip(('id', 'property'), output.split('@')[0].rsplit('.', 1)))
+
+    def with_values(items):
+        return [dict(item, value=values.get('{}.{}'.format(item['id'], item['property']))) for item in items]
+
+    return {
+        'output': output,
+        'outputs': outputs,
+        'inputs': with_values(spec['inputs']),
+        'state': with_values(spec['state']),
+        'changedPropIds': changed
+    }
+
+#Runs every server callback through the app with inputs a visitor would send, timing it and measuring the JSON it returns, as is and gzipped
+def bench_callbacks():
+    from app import app
+    import main
+
+    client = main.server.test_client()
+    plotted = {'reset': False, 'data': [1, 4, 10, 20]}
+    values = {
+        'submit-button.n_clicks': 1,
+        'reset-button.n_clicks': None,
+        'input-box.value': 30,
+        'storage.data': plotted,
+        'start-year-input.n_blur': 1,
+        'start-year-input.value': 1914,
+        'end-year-input.value': 2023,
+        'plot-width.data': 1200,
+        'modified-start-year-store.data': {'modified': False},
+        'data-source-dropdown.value': 'Headline CPI',
+        'span-start-input.value': '1990-03',
+        'span-end-input.value': '2020-03',
+        'visibility-store.data': {'4 Year': 'legendonly'},
+        'compare-dropdown.value': ['Headline CPI', 'Healthcare', 'College'],
+        'compare-years-input.value': 5,
+        'resolution-request.data': {'start': '1970-01-01', 'end': '1985-12-31'}
+    }
+    #(name, callback, changed inputs, values that differ from the ones above)
+    cases = [
+        ('update_storage', 'update_storage', ['submit-button.n_clicks'], {}),
+        ('track_start_year_modifications', 'track_start_year_modifications', ['start-year-input.n_blur'], {}),
+        ('adjust_start_year', 'adjust_start_year', ['data-source-dropdown.value'], {'data-source-dropdown.value': 'Core CPI'}),
+        ('update_span_result', 'update_span_result', ['span-end-input.value'], {}),
+        ('combined_update', 'combined_update', ['figure-request.data'], {'figure-request.data': {'trigger': 'data-source-dropdown.value'}}),
+        ('combined_update_append', 'combined_update', ['figure-request.data'], {'figure-request.data': {'trigger': 'storage.data'}}),
+        ('update_resolution_zoom', 'update_resolution', ['resolution-request.data'], {}),
+        ('update_resolution_years', 'update_resolution', ['resolution-request.data'],
+         {'resolution-request.data': {'start': '1914-01-01', 'end': '2023-12-31'}}),
+        ('update_custom_legend', 'update_custom_legend', ['storage.data'], {}),
+        ('update_comparison', 'update_comparison', ['compare-dropdown.value'], {}),
+        ('update_comparison_all', 'update_comparison', ['compare-dropdown.value'], {'compare-dropdown.value': category_names})
+    ]
+    #Every category is loaded before timing so no case includes a fetch
+    for name in category_names:
+        client.post('/_dash-update-component', json=callback_request(
+            app, 'adjust_start_year', dict(values, **{'data-source-dropdown.value': name}), ['data-source-dropdown.value']
+        ))
+
+    result = {}
+    for name, function_name, changed, overrides in cases:
+        body = callback_request(app, function_name, dict(values, **overrides), changed)
+        response = client.post('/_dash-update-component', json=body)
+        if response.status_code != 200:
+            raise RuntimeError('{} answered {}'.format(name, response.status_code))
+        compressed = client.post('/_dash-update-component', json=body, headers={'Accept-Encoding': 'gzip'})
+        result[name] = {
+            'seconds': best_time(lambda: client.post('/_dash-update-component', json=body)),
+            'response_bytes': len(response.data),
+            'compressed_bytes': len(compressed.data)
+        }
+    return result
+
+#Prebuilds the series of every category into a folder of its own and measures what a static server would send
+def bench_static_series():
+    import static_series
+    from series import dataset_for
+
+    directory = tempfile.mkdtemp(prefix='benchmark-')
+    for name in category_names:
+        dataset = dataset_for(name)
+    seconds = best_time(lambda: static_series.write_assets(dataset, directory), 1)
+    sizes = {'json': 0, 'gz': 0}
+    files = 0
+    for root, _, names in os.walk(os.path.join(directory, dataset.version)):
+        for name in names:
+            key = 'json' if name.endswith('.json') else 'gz'
+            sizes[key] += os.path.getsize(os.path.join(root, name))
+            files += key == 'json'
+    return {
+        'build_seconds': seconds,
+        'files': files,
+        'json_bytes': sizes['json'],
+        'gzip_bytes': sizes['gz']
+    }
+
+#Every benchmark, by the name its results are saved under
+BENCHMARKS = {
+    'loading': bench_loading,
+    'cold_load': bench_cold_load,
+    'compounding': bench_compounding,
+    'callbacks': bench_callbacks,
+    'static_series': bench_static_series
+}
+
+#Flattens nested results into {'callbacks.combined_update.seconds': ...}
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+#Prints how each timing and size changed from the baseline and returns the ones that got worse than TOLERANCE
+def compare(results, baseline, tolerance=TOLERANCE):
+    new, old = flatten(results), flatten(baseline)
+    regressions = []
+    for key in sorted(new):
+        if key not in old or not isinstance(new[key], (int, float)) or not old[key]:
+            continue
+        if not (key.endswith('seconds') or key.endswith('bytes')):
+            continue
+        ratio = new[key] / old[key]
+        flag = ''
+        if ratio > tolerance and not (key.endswith('seconds') and new[key] - old[key] < NOISE_SECONDS):
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print('{:<60} {:>12.4g} -> {:<12.4g} x{:.2f}{}'.format(key, old[key], new[key], ratio, flag))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time loading, compounding and callbacks against the saved pages.')
+    parser.add_argument('names', nargs='*', help='benchmarks to run: {} (default: all)'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='compare the results with the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--output', help='also write the results to this file')
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error('unknown benchmarks: {}'.format(', '.join(sorted(unknown))))
+
+    results = {name: BENCHMARKS[name]() for name in args.names or BENCHMARKS}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        sys.exit(1 if regressions else 0)
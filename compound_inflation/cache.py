@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+
+#Thread-safe LRU cache of computed arrays, bounded by their total size in bytes
+#Concurrent requests for the same missing key wait for a single computation instead of repeating it
+class HorizonCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    #Returns the cached array for key, calling compute() to fill it on a miss
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+                self.misses += 1
+            else:
+                #Someone else is already computing it
+                self.hits += 1
+
+        if not owner:
+            return pending.result()
+
+        try:
+            value = compute()
+            self._freeze(value)
+        except BaseException as error:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(error)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            self._store(key, value)
+        pending.set_result(value)
+        return value
+
+    #Bytes an entry counts for
+    def _size(self, value):
+        return value.nbytes
+
+    #Callers share the array, so nobody may write to it
+    def _freeze(self, value):
+        value.flags.writeable = False
+
+    #Adds an entry and evicts the least recently used ones until the cache fits its byte limit
+    def _store(self, key, value):
+        #Anything bigger than the whole cache is handed back without being kept
+        if self._size(value) > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._bytes += self._size(value)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._size(evicted)
+            self.evictions += 1
+
+    #Adds an already computed array
+    def put(self, key, value):
+        self._freeze(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._size(self._entries.pop(key))
+            self._store(key, value)
+
+    #Whether key is cached, without counting a hit or a miss
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    #Every cached key and array, least recently used first
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    #Drops every entry, e.g. when the dataset they were computed from is replaced
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    #Counters for monitoring
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+#The same cache for byte strings, e.g. compressed responses; they can't be written to, and count for their length
+class BytesCache(HorizonCache):
+    def _size(self, value):
+        return len(value)
+
+    def _freeze(self, value):
+        pass
+
+#Thread-safe LRU cache of finished figures, bounded by how many it holds
+#Figures are kept as the plain dicts Dash serializes, so a hit skips building the traces and the layout
+class FigureCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    #Returns the cached figure for key, calling build() to make it on a miss
+    def get(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        #Two requests missing the same figure both build it; the second simply replaces the first
+        figure = build()
+        self.put(key, figure)
+        return figure
+
+    #Adds an already built figure and evicts the least recently used ones beyond max_entries
+    def put(self, key, figure):
+        with self._lock:
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    #Whether key is cached, without counting a hit or a miss
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    #Every cached key and figure, least recently used first
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    #Counters for monitoring
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
@@ -1,18 +1,20 @@
 import csv
-import json
-import urllib.parse
 
 import dash
+from dash import Patch
 from dash import dcc
 from dash import html
-from dash.dependencies import Input, Output, State, ALL
+from dash.dependencies import Input, Output, State, ALL, ClientsideFunction
+import numpy as np
 import pandas as pd
-from plotly.graph_objs import Figure
 import plotly.graph_objs as go
 
 from app import app
-from load_tables import data_sources
-from utils import calculate_yoy, get_distinct_colors
+from components import DEFAULT_LINES
+from load_tables import category_names
+import session
+from series import before_swap, current, dataset_for
+from utils import get_distinct_colors, visible_indices
 
 #Updates storage container based on input values and reset button
 @app.callback(
@@ -29,11 +31,13 @@ def update_storage(submit_n_clicks, reset_n_clicks, input_value, storage_data):
     else:
         button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
+    stored = storage_data
+    storage_data = session.load(stored, DEFAULT_LINES)
     data = storage_data.get('data', [])
 
     # Reset button causes only the 1 year inflation rate to be displayed
     if button_id == 'reset-button':
-        return {'reset': True, 'data': [1]}  # Include a reset flag
+        return session.save(stored, {'reset': True, 'data': [1]}, DEFAULT_LINES)  # Include a reset flag
 
     # If no value is input, do nothing
     if not input_value:
@@ -42,21 +46,25 @@ def update_storage(submit_n_clicks, reset_n_clicks, input_value, storage_data):
     # Ensures input is always an integer
     input_value = int(input_value)
 
-    # If the value is not already in the data, append it
-    if input_value not in data:
-        data.append(input_value)
-    
-    return {'reset': False, 'data': data}
+    # A line that is already plotted needs no update
+    if input_value in data:
+        raise dash.exceptions.PreventUpdate
+
+    # New lines are always appended, so the plot can add just that one trace
+    data.append(input_value)
+
+    return session.save(stored, {'reset': False, 'data': data}, DEFAULT_LINES)
 
 @app.callback(
     Output('modified-start-year-store', 'data'),
     [Input('start-year-input', 'n_blur')],
     [State('modified-start-year-store', 'data')]
 )
-def track_start_year_modifications(n_blur, data):
+def track_start_year_modifications(n_blur, stored):
+    data = session.load(stored, {'modified': False})
     if n_blur ==True and n_blur > 0:
         data['modified'] = True
-    return data
+    return session.save(stored, data, {'modified': False})
 
 #Handles cases where the start year value should be changed automatically
 @app.callback(
@@ -66,8 +74,10 @@ def track_start_year_modifications(n_blur, data):
      State('modified-start-year-store', 'data')]
 )
 def adjust_start_year(data_source, current_start_year, modified_data):
+    modified_data = session.load(modified_data, {'modified': False})
+
     #determines data source
-    df_selected = data_sources[data_source]
+    df_selected = dataset_for(data_source).data_sources[data_source]
     earliest_year = df_selected.index.min().year
 
     #If the start year was never modified then the earliest year in a data source is populated as the start year when the data source has been switched
@@ -80,107 +90,83 @@ def adjust_start_year(data_source, current_start_year, modified_data):
 
     return current_start_year
 
-#Updates the plot and custom legend at the same time.
+#Answers month-to-month cumulative inflation queries from the price index
 @app.callback(
-    [Output('plot', 'figure'), Output('visibility-store', 'data')],
-    [
-     Input('start-year-input', 'value'),
-     Input('end-year-input', 'value'),
-     Input('data-source-dropdown', 'value'),
-     Input('storage', 'data'),
-     Input({'type': 'legend-button', 'index': ALL}, 'n_clicks')
-    ],
-    [State('visibility-store', 'data'),
-     State('plot', 'figure')]
+    Output('span-result', 'children'),
+    [Input('span-start-input', 'value'),
+     Input('span-end-input', 'value'),
+     Input('data-source-dropdown', 'value')]
 )
-def combined_update(start_year, end_year, data_source, storage_data, legend_button_clicks, visibility_data, current_fig):
-
-    # Extract the 'data' list from storage_data
-    data = storage_data.get('data', [])
-
-    # Based on the dropdown value, select the data source
-    df = data_sources[data_source]
-
-    # Ensure necessary columns exist in the new data source
-    for years in data:
-        if years != 1 and '{} Year'.format(years) not in df.columns:
-            #Applies compounded interest function
-            df[f'{years} Year'] = calculate_yoy(df, years)
-    
-    ctx = dash.callback_context
-
-    # Initialize fig
-    if current_fig is None or not isinstance(current_fig, Figure):
-        current_fig = go.Figure(current_fig)
-
-    # Check if the callback was triggered by a legend button
-    if "legend-button" in ctx.triggered[0]['prop_id']:
-        clicked_id = ctx.triggered[0]['prop_id'].split('.')[0]
-        trace_name = json.loads(clicked_id)['index']
-    
-        # Toggle trace visibility
-        for trace in current_fig['data']:
-            if trace['name'] == trace_name:
-                current_visibility = trace.visible or True  # Get the current visibility or default to True if not set
-                trace['visible'] = 'legendonly' if current_visibility == True else True
-
-                # Update the visibility data
-                visibility_data[trace_name] = trace['visible']
-
-        return [current_fig, visibility_data]  # Return the updated figure and updated visibility data
-
-    #Create snapshot of currently selected data source
-    df_filtered = df.copy()
-    # Apply date filter
-    df_filtered = df[(df.index.year >= start_year) & (df.index.year <= end_year)]
-
-    # Generate colors
-    colors = get_distinct_colors(len(data))
-
-    # Update or add lines for each year in data
-    for idx, year in enumerate(data):
-        column_name = '{} Year'.format(year)
-        y_values = df_filtered[column_name]
-
-        color=colors[idx]
-
-        existing_trace_index = next((i for i, trace in enumerate(current_fig['data']) if trace['name'] == column_name), None)
-
-        if existing_trace_index is not None:
-            current_fig['data'][existing_trace_index]['y'] = y_values
-            current_fig['data'][existing_trace_index]['x'] = df_filtered.index
-        else:
-            # Add a new line if it doesn't already exist
-            new_trace = go.Scatter(
-                x=df_filtered.index,
-                y=y_values,
-                mode='lines',
-                name=column_name,
-                line=dict(color=color)
-            )
-            current_fig.add_trace(new_trace)
-
-    # Apply stored visibility data
-    if visibility_data:
-        for trace in current_fig['data']:
-            trace_name = '{} Year'.format(trace['name'])
-            if trace_name in visibility_data:
-                trace['visible'] = visibility_data[trace_name]
+def update_span_result(start_month, end_month, data_source):
+    # Wait until both months are filled in
+    if not start_month or not end_month:
+        return ''
+
+    try:
+        change = dataset_for(data_source).cumulative_inflation(data_source, start_month.strip(), end_month.strip())
+    except ValueError:
+        return 'Enter two months covered by {}, as YYYY-MM.'.format(data_source)
+
+    return '{}: {}% from {} to {}'.format(data_source, change, start_month.strip(), end_month.strip())
+
+#Plot width assumed until the browser reports the real one
+DEFAULT_PLOT_WIDTH = 1200
+
+#Screen pixels per drawn point; a line never needs more points than the plot can show apart
+PIXELS_PER_POINT = 2
+
+#Above this many points in the figure, lines are drawn with WebGL
+WEBGL_POINTS = 5000
+
+#Widths plots are rounded up to before thinning, so figures are cached (and warmed) per step rather than per pixel
+PLOT_WIDTH_STEPS = (800, 1200, 1600, 2400)
+
+#The step a plot this wide is drawn at; wider plots than the last step get its points, which is still one every few pixels
+def width_step(plot_width):
+    width = int(plot_width or DEFAULT_PLOT_WIDTH)
+    return next((step for step in PLOT_WIDTH_STEPS if step >= width), PLOT_WIDTH_STEPS[-1])
+
+#Points each line is thinned to for a plot this wide
+def point_budget(plot_width):
+    return max(width_step(plot_width) // PIXELS_PER_POINT, 50)
+
+#Rows of the category inside the year range, which are sent at full resolution
+def year_window(dataset, data_source, start_year, end_year):
+    return dataset.year_slice(data_source, start_year or 0, end_year or 9999)
+
+#Dates the figure holds every month between, as text the browser can compare with the view, or None when it holds none unthinned
+#A window reaching either end of the category counts as open-ended, so year ranges past the data still fall inside it
+def detail_range(dataset, data_source, window, budget):
+    months = dataset.row_months[data_source]
+    start, stop, _ = window.indices(len(months))
+    if stop <= start or stop - start > budget:
+        return None
+    first = '0000-01-01' if start == 0 else str(months[start]) + '-01'
+    last = '9999-12-31' if stop == len(months) else str(months[stop - 1]) + '-31'
+    return [first, last]
+
+#Dates and values of one line: full resolution inside window, thinned to budget elsewhere
+def trace_points(dataset, data_source, years, window, budget):
+    values = dataset.get_horizon(data_source, years)
+    points = visible_indices(values, window, budget)
+    return dataset.data_sources[data_source].index[points], values[points]
+
+#Builds one line of the plot for the given horizon
+def make_trace(dataset, data_source, years, window, budget, color, visibility_data, webgl=False):
+    column_name = '{} Year'.format(years)
+    x, y = trace_points(dataset, data_source, years, window, budget)
+    return (go.Scattergl if webgl else go.Scatter)(
+        x=x,
+        y=y,
+        mode='lines',
+        name=column_name,
+        line=dict(color=color),
+        visible=visibility_data.get(column_name, True)
+    )
 
-    #This code triggers when the 'reset' button is clicked
-    if storage_data.get('reset', False):
-        traces_to_keep= ['1 Year']
-        current_fig['data'] = [trace for trace in current_fig['data'] if trace['name'] in traces_to_keep]
-        # Set all to visible
-        for trace in current_fig['data']:
-            trace['visible'] = True
-        visibility_data = {}  # Reset visibility_data
-
-        # Reset the data to 1-year inflation rate only
-        storage_data['data'] = [1]
-
-    #Make the graph look nice
-    current_fig.update_layout(
+#Makes the graph look nice; the prebuilt series in the assets use the same layout
+def style_figure(fig, data_source):
+    fig.update_layout(
         title_text="CompoundInflation.org",
         title_font=dict(
             family="Courier New, monospace",
@@ -215,33 +201,273 @@ def combined_update(start_year, end_year, data_source, storage_data, legend_butt
         ),
         plot_bgcolor='#FAFAFA',
         paper_bgcolor='#FAFAFA',
-        showlegend=False
+        showlegend=False,
+        #Keeps the reader's zoom while lines are added or sharpened, until the category changes
+        uirevision=data_source
     )
     
-    current_fig.update_yaxes(
+    fig.update_yaxes(
         zerolinecolor='black'
         )
-        
-    return [current_fig, visibility_data]  # Return the new figure and the unchanged visibility data
+
+#Builds the whole figure for a view as the plain dict Dash serializes, so it can be cached and shared by requests
+def build_figure(dataset, data_source, data, window, budget, visibility_data):
+    colors = get_distinct_colors(len(data))
+
+    # One line for each year in data, in the same order as storage so legend clicks can find them by position
+    webgl = len(data) * budget > WEBGL_POINTS
+    current_fig = go.Figure([
+        make_trace(dataset, data_source, year, window, budget, colors[idx], visibility_data, webgl) for idx, year in enumerate(data)
+    ])
+
+    style_figure(current_fig, data_source)
+    # Lets the browser tell which views it can show without asking for sharper lines
+    current_fig.update_layout(meta={'detail': detail_range(dataset, data_source, window, budget)})
+
+    return current_fig.to_plotly_json()
+
+#Identifies a view: the category, the lines in order, the rows sent at full resolution, the point budget and hidden lines
+def figure_key(data_source, data, window, budget, visibility_data):
+    return (data_source, tuple(data), int(window.start), int(window.stop), budget, tuple(sorted(visibility_data.items())))
+
+#Builds the first view a visitor gets for every loaded category at every width step, so first paint is a cache lookup
+#Figures carried over from the previous dataset are hits, so a new dataset only builds what changed
+def warm_figures(dataset=None):
+    dataset = dataset or current()
+    data = DEFAULT_LINES['data']
+    for data_source in dataset.arrays:
+        #The default years cover every month of a category
+        window = year_window(dataset, data_source, None, None)
+        for step in PLOT_WIDTH_STEPS:
+            budget = point_budget(step)
+            dataset.figure_cache.get(
+                figure_key(data_source, data, window, budget, {}),
+                lambda: build_figure(dataset, data_source, data, window, budget, {})
+            )
+
+#Every dataset swapped in later (a refresh, another worker's snapshot, a category loaded on first use) is warmed before it is served
+before_swap.append(warm_figures)
+
+#Draws the plot in the browser from the prebuilt series in the assets, which a CDN or static file server can serve
+#Views they don't cover (no build, longer horizons, lines kept in a server session) are sent to the server through figure-request
+app.clientside_callback(
+    ClientsideFunction(namespace='compound', function_name='drawFromAssets'),
+    [Output('plot', 'figure', allow_duplicate=True),
+     Output('visibility-store', 'data', allow_duplicate=True),
+     Output('figure-request', 'data')],
+    [Input('data-source-dropdown', 'value'),
+     Input('storage', 'data')],
+    [State('visibility-store', 'data')],
+    prevent_initial_call='initial_duplicate'
+)
+
+#Updates the plot and custom legend at the same time, for views the prebuilt series can't draw.
+#The plot holds every month of the category, thinned outside the year range; the range itself is applied in the browser.
+#Adding a line only appends its trace through a Patch; anything else rebuilds the figure.
+@app.callback(
+    [Output('plot', 'figure'), Output('visibility-store', 'data')],
+    [Input('figure-request', 'data')],
+    [State('data-source-dropdown', 'value'),
+     State('storage', 'data'),
+     State('visibility-store', 'data'),
+     State('start-year-input', 'value'),
+     State('end-year-input', 'value'),
+     State('plot-width', 'data')],
+    prevent_initial_call=True
+)
+def combined_update(figure_request, data_source, storage_data, visibility_data, start_year, end_year, plot_width):
+    storage_data = session.load(storage_data, DEFAULT_LINES)
+
+    # Extract the 'data' list from storage_data
+    data = storage_data.get('data', [])
+    visibility_data = visibility_data or {}
+
+    dataset = dataset_for(data_source)
+
+    # The year range is sent at full resolution, the rest of each line is thinned to what the plot can show
+    window = year_window(dataset, data_source, start_year, end_year)
+    budget = point_budget(plot_width)
+
+    # Generate colors
+    colors = get_distinct_colors(len(data))
+
+    # A new line was added: send only its trace
+    if (figure_request or {}).get('trigger') == 'storage.data' and not storage_data.get('reset', False):
+        patched_fig = Patch()
+        patched_fig['data'].append(make_trace(
+            dataset, data_source, data[-1], window, budget, colors[-1], visibility_data, len(data) * budget > WEBGL_POINTS
+        ))
+        # The other lines may have been sharpened for a zoom since, so which months are whole isn't known any more
+        patched_fig['layout']['meta'] = {'detail': None}
+        return [patched_fig, dash.no_update]
+
+    #This code triggers when the 'reset' button is clicked
+    if storage_data.get('reset', False):
+        # Reset the data to 1-year inflation rate only and set it visible
+        data = [1]
+        visibility_data = {}
+
+    # Figures are cached per view, so the default and popular views are served without building anything
+    key = figure_key(data_source, data, window, budget, visibility_data)
+    figure = dataset.figure_cache.get(key, lambda: build_figure(dataset, data_source, data, window, budget, visibility_data))
+    return [figure, visibility_data]  # Return the new figure and the current visibility data
+
+#Asks for sharper lines when a zoom, pan or year range moves the view onto months the plot holds thinned
+#Views inside the months the figure already holds whole are left to the browser
+app.clientside_callback(
+    ClientsideFunction(namespace='compound', function_name='requestResolution'),
+    Output('resolution-request', 'data'),
+    [Input('plot', 'relayoutData'),
+     Input('start-year-input', 'value'),
+     Input('end-year-input', 'value')],
+    [State('plot', 'figure')],
+    prevent_initial_call=True
+)
+
+#Sends the months in view at full resolution, replacing only each line's points
+@app.callback(
+    Output('plot', 'figure', allow_duplicate=True),
+    [Input('resolution-request', 'data')],
+    [State('data-source-dropdown', 'value'),
+     State('storage', 'data'),
+     State('plot-width', 'data')],
+    prevent_initial_call=True
+)
+def update_resolution(resolution_request, data_source, storage_data, plot_width):
+    if not resolution_request:
+        raise dash.exceptions.PreventUpdate
+    storage_data = session.load(storage_data, DEFAULT_LINES)
+    data = [1] if storage_data.get('reset', False) else storage_data.get('data', [])
+    dataset = dataset_for(data_source)
+
+    window = dataset.date_slice(data_source, resolution_request['start'], resolution_request['end'])
+    budget = point_budget(plot_width)
+    patched_fig = Patch()
+    for idx, years in enumerate(data):
+        x, y = trace_points(dataset, data_source, years, window, budget)
+        patched_fig['data'][idx]['x'] = x
+        patched_fig['data'][idx]['y'] = y
+    patched_fig['layout']['meta'] = {'detail': detail_range(dataset, data_source, window, budget)}
+    return patched_fig
+
+#Overlays one horizon of several categories on their shared months
+#Every category is a column of the dataset's aligned array, so adding one to the comparison is a column more, not a join
+@app.callback(
+    Output('compare-plot', 'figure'),
+    [Input('compare-dropdown', 'value'),
+     Input('compare-years-input', 'value'),
+     Input('start-year-input', 'value'),
+     Input('end-year-input', 'value')]
+)
+def update_comparison(data_sources, years, start_year, end_year):
+    if not years or int(years) < 1:
+        raise dash.exceptions.PreventUpdate
+    years = int(years)
+    data_sources = [source for source in category_names if source in (data_sources or [])]
+
+    # Categories nobody has selected yet are fetched first
+    dataset = current()
+    for data_source in data_sources:
+        if data_source not in dataset.arrays:
+            dataset = dataset_for(data_source)
+
+    months, values = dataset.compare_window(data_sources, years, start_year or 0, end_year or 9999)
+    # Months as 'YYYY-MM', which plotly reads as dates, instead of full timestamps
+    dates = np.datetime_as_string(months)
+
+    # Each category keeps its color whichever others are selected
+    colors = dict(zip(category_names, get_distinct_colors(len(category_names))))
+    webgl = values.size > WEBGL_POINTS
+    compare_fig = go.Figure([
+        (go.Scattergl if webgl else go.Scatter)(
+            x=dates,
+            y=values[:, column],
+            mode='lines',
+            name=data_source,
+            line=dict(color=colors[data_source])
+        ) for column, data_source in enumerate(data_sources)
+    ])
+
+    compare_fig.update_layout(
+        title_text='{} Year Inflation by Category'.format(years),
+        xaxis=dict(
+            title_text="Year",
+            showgrid=True,
+            gridcolor='LightGray',
+            gridwidth=0.5
+        ),
+        yaxis=dict(
+            title_text="Inflation Rate (%)",
+            showgrid=True,
+            gridcolor='LightGray',
+            gridwidth=0.5,
+            zerolinecolor='black'
+        ),
+        plot_bgcolor='#FAFAFA',
+        paper_bgcolor='#FAFAFA',
+        showlegend=True
+    )
+    return compare_fig
+
+#Reports the plot's width once the page has drawn it, so lines are thinned to what it can show
+app.clientside_callback(
+    ClientsideFunction(namespace='compound', function_name='measurePlot'),
+    Output('plot-width', 'data'),
+    [Input('plot', 'id')]
+)
+
+#Zooms the plot to the year range in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace='compound', function_name='applyYearRange'),
+    Output('plot', 'figure', allow_duplicate=True),
+    [Input('start-year-input', 'value'),
+     Input('end-year-input', 'value'),
+     Input('plot', 'figure')],
+    prevent_initial_call=True
+)
+
+#Toggles a line and greys out its legend item in the browser when the legend item is clicked
+app.clientside_callback(
+    ClientsideFunction(namespace='compound', function_name='toggleVisibility'),
+    [Output('plot', 'figure', allow_duplicate=True),
+     Output('visibility-store', 'data', allow_duplicate=True),
+     Output({'type': 'legend-button', 'index': ALL}, 'style'),
+     Output({'type': 'legend-swatch', 'index': ALL}, 'style')],
+    [Input({'type': 'legend-button', 'index': ALL}, 'n_clicks')],
+    [State('plot', 'figure'),
+     State('visibility-store', 'data'),
+     State({'type': 'legend-swatch', 'index': ALL}, 'style')],
+    prevent_initial_call=True
+)
 
 #Handles the legend and its special functionality
+#Only redrawn when lines are added or reset; clicks restyle the items in the browser
 @app.callback(
     Output('custom-legend', 'children'),
-    [Input('visibility-store', 'data'),
-     Input('plot', 'figure')]
+    [Input('storage', 'data')],
+    [State('visibility-store', 'data')]
 )
-def update_custom_legend(visibility_data, current_fig):
-    # Check if visibility_data or current_fig['data'] is None
-    if visibility_data is None or current_fig is None or not current_fig.get('data'):
+def update_custom_legend(storage_data, visibility_data):
+    storage_data = session.load(storage_data, DEFAULT_LINES)
+
+    # Check if the plotted lines are missing
+    if storage_data is None or not storage_data.get('data'):
         raise dash.exceptions.PreventUpdate
 
-    # Sort the traces based on their names
-    sorted_traces = sorted(current_fig['data'], key=lambda trace: int(trace['name'].split(' ')[0]))
+    # Colors follow the order the lines were plotted in; a reset makes every line visible again
+    if storage_data.get('reset', False):
+        data = [1]
+        visibility_data = {}
+    else:
+        data = storage_data['data']
+    visibility_data = visibility_data or {}
+    colors = get_distinct_colors(len(data))
 
     #Stores all legend items
     legend_children = []
-    for trace in sorted_traces:
-        trace_name = trace['name']
+    # Sort the lines based on their years
+    for years, color in sorted(zip(data, colors)):
+        trace_name = '{} Year'.format(years)
 
         # Retrieve the visibility from visibility_data (or default to True if not present)
         trace_visible = visibility_data.get(trace_name, True)
@@ -254,17 +480,18 @@ def update_custom_legend(visibility_data, current_fig):
             html.Div(
                 [
                     html.Span(
+                        id={'type': 'legend-swatch', 'index': trace_name},
                         style={
                             'display': 'inline-block',
                             'width': '12px',
                             'height': '12px',
-                            'backgroundColor': trace['line']['color'],
+                            'backgroundColor': color,
                             **legend_style
                         }
                     ),
                     html.Button(
-                        trace['name'],
-                        id={'type': 'legend-button', 'index': trace['name']},
+                        trace_name,
+                        id={'type': 'legend-button', 'index': trace_name},
                         style=legend_style
                     )
                 ]
@@ -272,41 +499,13 @@ def update_custom_legend(visibility_data, current_fig):
         )
     return legend_children
 
-#Controls 'Download CSV' functionality
-@app.callback(
+#Controls 'Download CSV' functionality by building a link to the export route in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace='compound', function_name='buildDownloadLink'),
     Output('download-link', 'href'),
     [Input('start-year-input', 'value'),
      Input('end-year-input', 'value'),
      Input('data-source-dropdown', 'value'),
-     Input('plot', 'figure')],
-     [State('visibility-store', 'data')]
+     Input('storage', 'data'),
+     Input('visibility-store', 'data')]
 )
-def update_download_link(start_year, end_year, data_source, current_fig, visibility_data):
-    # Filter the dataframe based on the year range and data source
-    df_filtered = data_sources[data_source][(data_sources[data_source].index.year >= start_year) & (data_sources[data_source].index.year <= end_year)]
-
-    # Start with all traces
-    all_traces = {trace['name'] for trace in current_fig['data']}
-    
-    # If visibility_data exists, consider only the traces that are not 'legendonly'
-    if visibility_data:
-        hidden_traces = {key for key, value in visibility_data.items() if value == 'legendonly'}
-    else:
-        hidden_traces = set()
-        
-    # Calculate the set of visible traces
-    visible_traces = all_traces - hidden_traces
-
-    # Sort the visible traces by the numerical value of the year
-    visible_traces = sorted(visible_traces, key=lambda x: int(x.split(' ')[0]))
-
-    # Filter the dataframe to only include visible traces
-    df_filtered = df_filtered[list(visible_traces)].dropna(how='all')
-
-    # Convert the DataFrame to a CSV string
-    csv_string = df_filtered.to_csv(index=True, encoding='utf-8')
-    
-    # Create a data URI
-    csv_data_uri = f"data:text/csv;charset=utf-8,{urllib.parse.quote(csv_string)}"
-    
-    return csv_data_uri
@@ -5,7 +5,7 @@ from dash import dcc
 from dash import html
 from dash import dash_table
 
-from load_tables import data_sources
+from load_tables import category_names
 
 #Used to input desired cumulative interest rate
 input_box = dcc.Input(id='input-box', type='number', placeholder='Input Time Scale', n_blur=0)
@@ -16,12 +16,24 @@ reset_button = html.Button('Reset', id='reset-button')
 #Creates a new line based on the input value
 submit_button = html.Button('Add Line', id='submit-button')
 
-#Stores lines displayed
-storage = dcc.Store(id='storage', data={'reset': False, 'data': [1, 4]})
+#Lines plotted when the page opens
+DEFAULT_LINES = {'reset': False, 'data': [1, 4]}
+
+#Stores lines displayed (or only a session key when SESSION_STORE keeps them on the server)
+storage = dcc.Store(id='storage', data=DEFAULT_LINES)
 
 #Stores lines visible (not made hidden by clicking the legend item)
 visibility_store = dcc.Store(id='visibility-store', data={})
 
+#Width of the plot in pixels, measured in the browser
+plot_width_store = dcc.Store(id='plot-width')
+
+#Asks the server for the plot when the prebuilt series in the assets can't draw it
+figure_request = dcc.Store(id='figure-request')
+
+#Asks the server for sharper lines when the view moves onto months the plot only holds thinned
+resolution_request = dcc.Store(id='resolution-request')
+
 #Tracks whether or not the start year in the year range was modified
 modified_start_year_store = dcc.Store(id='modified-start-year-store', data={'modified': False})
 
@@ -111,6 +123,19 @@ about_section = html.Div(
                     ]
                 ),
                 
+                #Describes month-to-month query
+                html.Li(
+                    [
+                        html.I(className="fas fa-exchange-alt"),  # Icon
+                        " Between Months: ",
+                        html.Span("See how much prices rose between any two months. "),
+                        html.Small(
+                            "For example, enter 1990-03 and 2023-11. "
+                            "Spans of whole years are exact; other spans are estimated from the YoY rates."
+                        )
+                    ]
+                ),
+
                 #Describes reset function
                 html.Li(
                     [
@@ -196,10 +221,34 @@ end_year_input = dcc.Input(
     }
 )
 
+# Input fields for the months of a cumulative inflation query
+span_start_input = dcc.Input(
+    id='span-start-input',
+    type='text',
+    placeholder='YYYY-MM',
+    debounce=True,
+    style={
+        'width': '80px'
+    }
+)
+
+span_end_input = dcc.Input(
+    id='span-end-input',
+    type='text',
+    placeholder='YYYY-MM',
+    debounce=True,
+    style={
+        'width': '80px'
+    }
+)
+
+#Shows the cumulative inflation between the two months
+span_result = html.Div(id='span-result', style={'marginTop': '5px'})
+
 # Dropdown for data source selection
 data_source_dropdown = dcc.Dropdown(
     id='data-source-dropdown',
-    options=[{'label': source, 'value': source} for source in data_sources.keys()],
+    options=[{'label': source, 'value': source} for source in category_names],
     value='Headline CPI' ,# default value
     style={
         'width': '200px',
@@ -288,6 +337,35 @@ control_center = html.Div(
                 'boxShadow': '3px 3px 5px #aaa',
                 'width': 'auto'
             }
+        ),
+
+        # Month-to-month Section
+        html.Div(
+            [
+                html.Label(
+                    'Between Months  ',
+                    style={
+                        'fontWeight': 'bold'
+                    }
+                ),
+                span_start_input,
+                html.Label(
+                    '  -  ',
+                    style={
+                        'fontWeight': 'bold'
+                    }
+                ),
+                span_end_input,
+                span_result
+            ],
+            style={
+                'border': '1px solid #ccc',
+                'padding': '5px',
+                'borderRadius': '5px',
+                'backgroundColor': '#f8f8f8',
+                'boxShadow': '3px 3px 5px #aaa',
+                'width': 'auto'
+            }
         )
     ],
     style={
@@ -298,6 +376,73 @@ control_center = html.Div(
     }
 )
 
+#Categories overlaid in the comparison plot
+compare_dropdown = dcc.Dropdown(
+    id='compare-dropdown',
+    options=[{'label': source, 'value': source} for source in category_names],
+    value=['Headline CPI'],
+    multi=True,
+    style={
+        'minWidth': '300px',
+        'fontFamily': 'Arial, sans-serif',
+        'borderRadius': '5px'
+    }
+)
+
+#Horizon compared across the categories
+compare_years_input = dcc.Input(
+    id='compare-years-input',
+    type='number',
+    placeholder='Time Scale',
+    value=1,
+    min=1,
+    debounce=True,
+    style={
+        'width': '80px'
+    }
+)
+
+#Overlays one horizon of several categories, over the year range of the main plot
+comparison_section = html.Div(
+    [
+        html.H4("Compare Categories"),
+        html.Div(
+            [
+                compare_dropdown,
+                html.Label(
+                    'Years  ',
+                    style={
+                        'fontWeight': 'bold'
+                    }
+                ),
+                compare_years_input
+            ],
+            style={
+                'display': 'flex',
+                'gap': '10px',
+                'alignItems': 'center',
+                'marginBottom': '10px'
+            }
+        ),
+        dcc.Loading(
+            id="loading-compare-plot",
+            type="circle",
+            children=[
+                dcc.Graph(
+                    id='compare-plot',
+                    style={
+                        'boxShadow': '3px 3px 5px #aaa'
+                    }
+                )
+            ]
+        )
+    ],
+    style={
+        'marginTop': '20px',
+        'marginBottom': '20px'
+    }
+)
+
 #Descriptions of every category of inflation
 descriptions = [
     {
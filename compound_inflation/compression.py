@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import request
+
+from app import app
+from cache import BytesCache
+
+#Brotli is optional; without it responses are only gzipped
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#Responses smaller than this many bytes are sent as they are, since compressing them saves next to nothing
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+#Size limit of the cache of compressed responses; identical responses (the layout, the default view, Dash's scripts) are compressed once
+COMPRESS_CACHE_BYTES = int(os.environ.get('COMPRESS_CACHE_BYTES', 16 * 1024 * 1024))
+
+#Types worth compressing; images and the prebuilt series (already compressed) are left alone
+COMPRESSIBLE = {
+    'application/json', 'application/javascript', 'text/javascript', 'text/html', 'text/css', 'text/plain', 'text/csv',
+    'image/svg+xml'
+}
+
+#Encodings in the order they are preferred, with the function making each
+ENCODINGS = [('gzip', lambda data: gzip.compress(data, 6))]
+if brotli is not None:
+    ENCODINGS.insert(0, ('br', lambda data: brotli.compress(data, quality=5)))
+
+#Compressed bodies keyed by encoding and a hash of the original
+_cache = BytesCache(COMPRESS_CACHE_BYTES)
+
+#Counts since this worker started, for /metrics
+_counts = {'responses': 0, 'bytes_in': 0, 'bytes_out': 0}
+_lock = threading.Lock()
+
+#The encoding to send, or None when the client accepts none of them
+def choose_encoding(accept_encodings):
+    for name, compress in ENCODINGS:
+        if accept_encodings[name]:
+            return name, compress
+    return None
+
+#Compresses the body of a response the client can take compressed
+#Streamed and file responses (the CSV export, static files) are passed through, as are responses that are already encoded
+@app.server.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    chosen = choose_encoding(request.accept_encodings)
+    if chosen is None:
+        return response
+    name, compress = chosen
+    key = (name, hashlib.sha1(data).digest(), len(data))
+    compressed = _cache.get(key, lambda: compress(data))
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = name
+    with _lock:
+        _counts['responses'] += 1
+        _counts['bytes_in'] += len(data)
+        _counts['bytes_out'] += len(compressed)
+
+    #The compressed body is a different representation, so its ETag can only be weak
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+        response.make_conditional(request)
+    return response
+
+#Counters for monitoring
+def stats():
+    with _lock:
+        counts = dict(_counts)
+    counts['cache'] = _cache.stats()
+    return counts
@@ -0,0 +1,64 @@
+from flask import Response, abort, request, stream_with_context
+
+from app import app
+from components import DEFAULT_LINES
+from load_tables import category_names
+import session
+from series import dataset_for
+
+#Rows converted to CSV at a time while streaming
+CHUNK_ROWS = 500
+
+#Most horizons one request may ask for
+MAX_HORIZONS = 100
+
+#Whether a horizon can be computed; the same rule for every route that takes horizons
+def valid_horizon(years):
+    return years >= 1
+
+#Reads a comma separated list of horizons like '1,4,10'
+def parse_horizons(value):
+    try:
+        horizons = sorted({int(part) for part in value.split(',') if part.strip()})
+    except ValueError:
+        abort(400, 'horizons must be a comma separated list of whole years')
+    if not all(valid_horizon(years) for years in horizons):
+        abort(400, 'horizons must be at least 1 year')
+    if len(horizons) > MAX_HORIZONS:
+        abort(400, 'at most {} horizons per request'.format(MAX_HORIZONS))
+    return horizons
+
+#Streams the requested lines as CSV, generated only when the download is clicked
+#e.g. /export?category=Headline%20CPI&horizons=1,4&start=1914&end=2023
+@app.server.route(app.config.routes_pathname_prefix + 'export')
+def export_csv():
+    data_source = request.args.get('category', 'Headline CPI')
+    if data_source not in category_names:
+        abort(404, 'unknown category')
+    dataset = dataset_for(data_source)
+    #With SESSION_STORE the link names the session holding the lines, and which of them are hidden
+    if 'session' in request.args:
+        if not session.is_session({'session': request.args['session']}):
+            abort(400, 'unknown session')
+        lines = session.load({'session': request.args['session']}, DEFAULT_LINES)
+        plotted = [1] if lines.get('reset', False) else lines.get('data', [])
+        horizons = sorted(set(plotted) - set(parse_horizons(request.args.get('hidden', ''))))
+    else:
+        horizons = parse_horizons(request.args.get('horizons', ''))
+    start_year = request.args.get('start', 0, type=int)
+    end_year = request.args.get('end', 9999, type=int)
+
+    df = dataset.get_window(data_source, horizons, start_year, end_year).dropna(how='all')
+
+    def generate():
+        for start in range(0, len(df), CHUNK_ROWS):
+            yield df.iloc[start:start + CHUNK_ROWS].to_csv(header=start == 0)
+        # An empty window still gets the header row
+        if df.empty:
+            yield df.to_csv()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=data.csv'}
+    )
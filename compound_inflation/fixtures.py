@@ -0,0 +1,122 @@
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+
+import numpy as np
+
+from load_tables import MONTHS, fetch_page, page_file, tasks
+
+#Saved pages of every category, one html file each
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+#Last year in the synthetic pages, with readings up to September like a table mid-year
+SYNTHETIC_LAST_YEAR = 2023
+SYNTHETIC_LAST_MONTH = 9
+
+#Saves the live page of every category into directory
+def capture(directory=FIXTURES_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for task in tasks:
+        with open(os.path.join(directory, page_file(task.url)), 'w', encoding='utf-8') as f:
+            f.write(fetch_page(task.url))
+
+#One html table row
+def table_row(cells, tag='td'):
+    return '<tr>' + ''.join('<{0}>{1}</{0}>'.format(tag, cell) for cell in cells) + '</tr>'
+
+#A made up page for a category, laid out the way its real table is, with the same quirks
+#Seeded by the category's position so every run writes the same pages
+def synthetic_page(task, seed):
+    rng = np.random.default_rng(seed)
+    header = ['Year'] + MONTHS + ['Ave']
+    #Gas spells its headers in lower case
+    if task.name == 'Gas':
+        header = [column.lower() for column in header]
+
+    #Tables with a first_year start a few years before it, so the cutoff has something to drop
+    first_year = task.earliest_year - (7 if task.layout.first_year else 0)
+    rows = []
+    for year in range(first_year, SYNTHETIC_LAST_YEAR + 1):
+        values = ['{:.1f}'.format(value) for value in rng.normal(3, 4, 12)]
+        average = '{:.1f}'.format(np.mean([float(value) for value in values]))
+        if year == SYNTHETIC_LAST_YEAR:
+            values = values[:SYNTHETIC_LAST_MONTH] + ['Avail. Nov. 13'] + [''] * (11 - SYNTHETIC_LAST_MONTH)
+            average = ''
+        rows.append([str(year)] + values + [average])
+    for year, month in task.layout.skip_cells:
+        rows[year - first_year][MONTHS.index(month) + 1] = 'Data not available'
+
+    if task.layout.header_row is None:
+        table = '<thead>' + table_row(header, 'th') + '</thead><tbody>' + ''.join(map(table_row, rows)) + '</tbody>'
+    elif task.layout.header_row == 'top':
+        table = '<tbody>' + ''.join(map(table_row, [header] + rows)) + '</tbody>'
+    else:
+        table = '<tbody>' + ''.join(map(table_row, rows + [header])) + '</tbody>'
+    return (
+        '<!DOCTYPE html><html><head><title>{0} (synthetic)</title></head><body>'
+        '<!-- Synthetic stand-in written by fixtures.py; run "python fixtures.py capture" to save the real page -->'
+        '<h1>{0}</h1><table>{1}</table>'
+        '<table><tr><td>Related</td><td>Table</td></tr></table>'
+        '</body></html>'
+    ).format(task.name, table)
+
+#Writes a synthetic page for every category into directory, for machines that can't reach the site
+def synthesize(directory=FIXTURES_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for seed, task in enumerate(tasks):
+        with open(os.path.join(directory, page_file(task.url)), 'w', encoding='utf-8') as f:
+            f.write(synthetic_page(task, seed))
+
+#Serves the saved pages under any path ending in the category's url name, like the site does
+#delay is added to every response and the categories named in fail get a 503, to test the loader against a slow or broken site
+def make_server(directory=FIXTURES_DIR, port=8052, delay=0, fail=()):
+    failing = {page_file(task.url) for task in tasks if task.name in fail}
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            name = page_file(self.path)
+            path = os.path.join(directory, name)
+            if name in failing:
+                self.send_error(503)
+                return
+            if not os.path.exists(path):
+                self.send_error(404)
+                return
+            with open(path, 'rb') as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer(('127.0.0.1', port), FixtureHandler)
+
+#Starts the fixture server on a background thread and returns it along with its base url; port 0 picks a free port
+def start_server(directory=FIXTURES_DIR, port=0, delay=0, fail=()):
+    server = make_server(directory, port, delay, fail)
+    threading.Thread(target=server.serve_forever, name='fixtures', daemon=True).start()
+    return server, 'http://127.0.0.1:{}/'.format(server.server_address[1])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Save, make up or serve the pages the tables are scraped from.')
+    parser.add_argument('command', choices=['capture', 'synthesize', 'serve'])
+    parser.add_argument('--dir', default=FIXTURES_DIR)
+    parser.add_argument('--port', type=int, default=8052)
+    parser.add_argument('--delay', type=float, default=0, help='seconds added to every response')
+    parser.add_argument('--fail', default='', help='comma separated category names answered with a 503')
+    args = parser.parse_args()
+
+    if args.command == 'capture':
+        capture(args.dir)
+    elif args.command == 'synthesize':
+        synthesize(args.dir)
+    else:
+        print('Serving {} on http://127.0.0.1:{}/ (set INFLATION_SOURCE to that url)'.format(args.dir, args.port))
+        make_server(args.dir, args.port, args.delay, args.fail.split(',')).serve_forever()
@@ -0,0 +1,88 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+from load_tables import category_names
+from series import current, dataset_for
+
+#Formats the grid can be written in; parquet needs pyarrow, which the app itself doesn't
+FORMATS = ['csv', 'parquet']
+
+#Reads horizons like '1-50' or '1,5,10' (or a mix, '1-10,20,30')
+def parse_horizons(value):
+    horizons = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        horizons.update(range(int(first), int(last or first) + 1))
+    if not horizons or min(horizons) < 1:
+        raise ValueError('horizons must be whole years of 1 or more')
+    return sorted(horizons)
+
+#Folder of one category in the output, named the way partitioned datasets are (category=<name>)
+def partition_dir(output, data_source):
+    return os.path.join(output, 'category={}'.format(data_source))
+
+#Writes every horizon of one category as its own partition and returns what was written
+#Runs in the pool's processes, each reading the same memory-mapped snapshot
+def write_partition(data_source, horizons, start_year, end_year, output, file_format):
+    df = current().get_window(data_source, horizons, start_year, end_year).dropna(how='all')
+    directory = partition_dir(output, data_source)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'part-0.{}'.format(file_format))
+    if file_format == 'parquet':
+        df.to_parquet(path)
+    else:
+        df.to_csv(path)
+    return data_source, len(df), int(df.count().sum()), os.path.getsize(path)
+
+#Computes every category across the horizons and writes one partitioned dataset to output
+#Categories not loaded yet are fetched first, so the pool only reads the snapshot
+def write_grid(output, horizons, selected=category_names, start_year=0, end_year=9999, file_format='csv', processes=os.cpu_count() or 1):
+    for data_source in selected:
+        dataset_for(data_source)
+    args = [(data_source, horizons, start_year, end_year, output, file_format) for data_source in selected]
+
+    if processes < 2 or len(selected) < 2:
+        return [write_partition(*arg) for arg in args]
+    with ProcessPoolExecutor(min(processes, len(selected))) as executor:
+        return list(executor.map(write_partition, *zip(*args)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write the compounded series of every category at many horizons, one partition per category.')
+    parser.add_argument('output', help='folder the dataset is written to')
+    parser.add_argument('--horizons', default='1-50', help="e.g. '1-50' or '1,5,10' (default: 1-50)")
+    parser.add_argument('--categories', default=','.join(category_names), help='comma separated categories (default: all)')
+    parser.add_argument('--start', type=int, default=0, help='first year')
+    parser.add_argument('--end', type=int, default=9999, help='last year')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    try:
+        horizons = parse_horizons(args.horizons)
+    except ValueError as error:
+        parser.error(str(error))
+    selected = [name.strip() for name in args.categories.split(',') if name.strip()]
+    unknown = set(selected) - set(category_names)
+    if unknown:
+        parser.error('unknown categories: {}'.format(', '.join(sorted(unknown))))
+    if args.format == 'parquet':
+        try:
+            import pyarrow
+        except ImportError:
+            parser.error('parquet output needs pyarrow: pip install pyarrow')
+
+    start = time.perf_counter()
+    written = write_grid(args.output, horizons, selected, args.start, args.end, args.format, args.processes)
+    seconds = time.perf_counter() - start
+
+    for data_source, rows, values, size in written:
+        print('{:<14} {:>7} rows {:>9} values {:>11} bytes'.format(data_source, rows, values, size))
+    values = sum(item[2] for item in written)
+    print('Wrote {} values ({} categories x {} horizons) to {} in {:.2f}s, {:,.0f} values/s'.format(
+        values, len(written), len(horizons), args.output, seconds, values / seconds
+    ))
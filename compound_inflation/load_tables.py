@@ -1,130 +1,218 @@
-from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+import urllib.request
 
+import lxml.html
+import numpy as np
 import pandas as pd
+from pandas.io.parsers import TextParser
 
-#Works for most of the tables from usinflationcalculator.com
-def make_usable(df):
-    df=df.melt(id_vars='Year', var_name='Month', value_name='YoY')
-    #Clean
-    df.dropna(inplace=True)
-    # #That's not a month
-    df=df[df['Month']!='Ave']
-    # #Make date usable
-    df['Date']=df['Year'].astype('str')+df['Month']
-    df['Date']=pd.to_datetime(df['Date'], format='%Y%b')
-    #Gets rid of value that is just the date of the next CPI reading
-    df=df[~df['YoY'].astype('str').str.contains('Avail.')][['Date', 'YoY']]
-    df['YoY']=[float(x) for x in df['YoY']]
-    df.rename(columns={'YoY': '1 Year'}, inplace=True)
-    df.sort_values('Date', inplace=True, ignore_index=True)
-    df.set_index('Date', inplace=True)
-    return df
-
-#Headline CPI
-def process_mi(mi):
-    return make_usable(mi)
-    
-#Core CPI
-def process_ci(ci):
-    ci.columns=ci.iloc[len(ci)-1]
-    ci=ci[:-1]
-    return make_usable(ci)
-
-#Energy inflation
-def process_ei(ei):
-    ei.columns=ei.iloc[0]
-    ei=ei[1:]
-    return make_usable(ei)
-
-#Gasoline
-def process_ga(ga):
-    ga.columns=ga.iloc[0]
-    ga=ga[1:]
-    ga.columns=ga.columns.str.capitalize()
-    return make_usable(ga)
-
-#Groceries
-def process_gi(gi):
-    gi.columns=gi.iloc[0]
-    gi=gi[1:]
-    return make_usable(gi)
-
-#Food
-def process_fi(fi):
-    return make_usable(fi)
-
-#Health Care
-def process_hi(hi):
-    hi.columns=hi.iloc[0]
-    hi=hi[1:]
-    return make_usable(hi)
-
-#College
-def process_co(co):
-    co.columns=co.iloc[0]
-    co=co[1:]
-    co=co.melt(id_vars='Year', var_name='Month', value_name='YoY')
-    #Clean
-    huh=co[(co['Month']=='Jan')&(co['Year']=='1978')]['YoY'].values[0]
-    co=co[co['YoY']!=huh]
-    co.dropna(inplace=True)
-    # # #That's not a month
-    co=co[co['Month']!='Ave']
-    # # #Make date usable
-    co['Date']=co['Year'].astype('str')+co['Month']
-    co['Date']=pd.to_datetime(co['Date'], format='%Y%b')
-    #Final fix
-    co=co[~co['YoY'].astype('str').str.contains('Avail.')][['Date', 'YoY']]
-    co['YoY']=[float(x) for x in co['YoY']]
-    co.rename(columns={'YoY':'1 Year'}, inplace=True)
-    co.sort_values('Date', inplace=True, ignore_index=True)
-    co.set_index('Date', inplace=True)
-    return co
-
-#Airline
-def process_ai(ai):
-    ai.columns=ai.iloc[0]
-    ai=ai[1:]
-    ai=ai[ai['Year'].astype('int')>=1970]
-    return make_usable(ai)
-
-#Matches url of the table with the prcoessing function for it
+from snapshot import MAX_HORIZON, SNAPSHOT_PATH, map_snapshot, save_snapshot, snapshot_lock, to_data_sources
+
+#Month columns of every table, in calendar order
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+#What differs between the tables from usinflationcalculator.com
+#header_row: where the Year/Jan/.../Dec row sits when it isn't the table header ('top' or 'bottom')
+#first_year: earlier years are dropped
+#skip_cells: (year, month) cells that hold a note rather than a reading
+Layout = namedtuple('Layout', ['header_row', 'first_year', 'skip_cells'], defaults=[None, None, ()])
+
+#Turns a table with a Year column and a column per month into one reading per month, indexed by date
+#Anything that isn't a number ("Avail. ..." cells, footnotes, blanks) is dropped in the same pass that converts the rest
+def make_usable(df, layout=Layout()):
+    if layout.header_row == 'top':
+        df = df[1:].set_axis(df.iloc[0], axis=1)
+    elif layout.header_row == 'bottom':
+        df = df[:-1].set_axis(df.iloc[-1], axis=1)
+    #Some tables write the months in lower case
+    df = df.set_axis([str(column).strip().capitalize() for column in df.columns], axis=1)
+
+    years = pd.to_numeric(df['Year'], errors='coerce').to_numpy(dtype=float)
+    cells = df[MONTHS].to_numpy().ravel()
+    values = pd.to_numeric(pd.Series(cells, dtype=object), errors='coerce').to_numpy(dtype=float).reshape(len(df), 12)
+
+    #Rows are years and columns months, so each cell's month count is arithmetic
+    keep = ~np.isnan(values) & ~np.isnan(years)[:, None]
+    if layout.first_year is not None:
+        keep &= (years >= layout.first_year)[:, None]
+    for year, month in layout.skip_cells:
+        keep[years == year, MONTHS.index(month)] = False
+    rows, months = np.nonzero(keep)
+    dates = (years[rows].astype(int) - 1970) * 12 + months
+
+    order = np.argsort(dates, kind='stable')
+    index = pd.DatetimeIndex(dates[order].astype('datetime64[M]').astype('datetime64[ns]'), name='Date')
+    return pd.DataFrame({'1 Year': values[rows, months][order]}, index=index)
+
+#What is known about a category before its table is fetched
+#earliest_year is only used until the table itself is loaded
+Category = namedtuple('Category', ['name', 'url', 'layout', 'earliest_year'])
+
+#Matches each category with the url of its table and how that table is laid out
 tasks = [
-    ('https://www.usinflationcalculator.com/inflation/historical-inflation-rates/', process_mi),
-    ('https://www.usinflationcalculator.com/inflation/united-states-core-inflation-rates/', process_ci),
-    ('https://www.usinflationcalculator.com/inflation/energy-prices-gasoline-electricity-and-fuel-oil-2015-present/', process_ei),
-    ('https://www.usinflationcalculator.com/inflation/gasoline-inflation-in-the-united-states/', process_ga),
-    ('https://www.usinflationcalculator.com/inflation/average-prices-for-selected-grocery-store-items-2015-present/', process_gi),
-    ('https://www.usinflationcalculator.com/inflation/food-inflation-in-the-united-states/', process_fi),
-    ('https://www.usinflationcalculator.com/inflation/health-care-inflation-in-the-united-states/', process_hi),
-    ('https://www.usinflationcalculator.com/inflation/college-tuition-inflation-in-the-united-states/', process_co),
-    ('https://www.usinflationcalculator.com/inflation/airfare-inflation/', process_ai)
+    Category('Headline CPI', 'https://www.usinflationcalculator.com/inflation/historical-inflation-rates/', Layout(), 1914),
+    Category('Core CPI', 'https://www.usinflationcalculator.com/inflation/united-states-core-inflation-rates/', Layout(header_row='bottom'), 1957),
+    Category('Energy', 'https://www.usinflationcalculator.com/inflation/energy-prices-gasoline-electricity-and-fuel-oil-2015-present/', Layout(header_row='top'), 2015),
+    Category('Gas', 'https://www.usinflationcalculator.com/inflation/gasoline-inflation-in-the-united-states/', Layout(header_row='top'), 1936),
+    Category('Grocery', 'https://www.usinflationcalculator.com/inflation/average-prices-for-selected-grocery-store-items-2015-present/', Layout(header_row='top'), 2015),
+    Category('Food', 'https://www.usinflationcalculator.com/inflation/food-inflation-in-the-united-states/', Layout(), 1914),
+    Category('Healthcare', 'https://www.usinflationcalculator.com/inflation/health-care-inflation-in-the-united-states/', Layout(header_row='top'), 1948),
+    Category('College', 'https://www.usinflationcalculator.com/inflation/college-tuition-inflation-in-the-united-states/', Layout(header_row='top', skip_cells=((1978, 'Jan'),)), 1978),
+    Category('Airline', 'https://www.usinflationcalculator.com/inflation/airfare-inflation/', Layout(header_row='top', first_year=1970), 1970)
 ]
+
+#Every category name, in the order the dropdown lists them
+category_names = [task.name for task in tasks]
+
+#Processes used to parse pages when several change at once; 1 parses them in this process
+PARSE_PROCESSES = int(os.environ.get('PARSE_PROCESSES', os.cpu_count() or 1))
+
+#Categories fetched as soon as the app starts; the rest wait until someone selects them
+EAGER_CATEGORIES = os.environ.get('EAGER_CATEGORIES', 'Headline CPI').split(',')
+
+#Looks up a registered category by name
+def find_task(name):
+    for task in tasks:
+        if task.name == name:
+            return task
+    raise KeyError(name)
  
-#Fetches processed table from its url
-def fetch_and_process_data(task):
-    url, processing_function = task
-    df = pd.read_html(url)[0]
-    return processing_function(df)
+#Where pages are read from: unset for the live site, a base url (e.g. the fixture server) or a directory of saved pages
+INFLATION_SOURCE = os.environ.get('INFLATION_SOURCE', '')
+
+#File a category's page is saved as, named after the last part of its url
+def page_file(url):
+    return urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1] + '.html'
+
+#Downloads the raw html of a table's page, or reads it from INFLATION_SOURCE when that is set
+def fetch_page(url):
+    if INFLATION_SOURCE and not INFLATION_SOURCE.startswith(('http://', 'https://')):
+        with open(os.path.join(INFLATION_SOURCE, page_file(url)), encoding='utf-8') as f:
+            return f.read()
+    if INFLATION_SOURCE:
+        url = INFLATION_SOURCE.rstrip('/') + urlsplit(url).path
+    request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read().decode('utf-8', errors='replace')
+
+#Fingerprint of a page, used to skip pages that haven't changed
+def page_hash(html):
+    return hashlib.sha256(html.encode()).hexdigest()
+
+#Runs of whitespace inside a cell, collapsed the same way pd.read_html does
+WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+
+#Text of every cell in a row, with colspans repeated like pd.read_html does
+def row_texts(row):
+    texts = []
+    for cell in row.xpath('./td | ./th'):
+        text = WHITESPACE.sub(' ', cell.text_content().strip())
+        texts.extend([text] * int(cell.get('colspan') or 1))
+    return texts
+
+#Reads only the first table of a page, instead of having pd.read_html build every table and keeping one
+#The header rules and type inference are pd.read_html's, so make_usable sees the same DataFrame
+def read_first_table(html):
+    tables = lxml.html.fromstring(html).xpath('(//table)[1]')
+    if not tables:
+        raise ValueError('No tables found')
+    table = tables[0]
+    for hidden in table.xpath('.//*[contains(translate(@style, " ", ""), "display:none")]'):
+        hidden.drop_tree()
+
+    head = table.xpath('./thead/tr')
+    body = table.xpath('./tbody/tr | ./tr')
+    foot = table.xpath('./tfoot/tr')
+    #Without a <thead>, leading rows made only of <th> cells are the header
+    if not head:
+        while body and all(cell.tag == 'th' for cell in body[0].xpath('./td | ./th')):
+            head.append(body.pop(0))
+
+    rows = [row_texts(row) for row in head + body + foot]
+    width = max(len(row) for row in rows)
+    rows = [row + [''] * (width - len(row)) for row in rows]
+    if not head:
+        header = None
+    elif len(head) == 1:
+        header = 0
+    else:
+        header = [i for i, row in enumerate(rows[:len(head)]) if any(row)]
+    with TextParser(rows, header=header) as parser:
+        return parser.read()
+
+#Turns a page's raw html into its processed table
+def process_page(html, layout):
+    return make_usable(read_first_table(html), layout)
+
+#Fetches the raw html of every table with multi-threading; downloads spend their time waiting, so threads are enough
+def fetch_pages(selected_tasks=tasks):
+    with ThreadPoolExecutor() as executor:
+        pages = executor.map(fetch_page, [task.url for task in selected_tasks])
+        return {task.name: html for task, html in zip(selected_tasks, pages)}
+
+#How the parse pool starts its processes. A fork copies only the calling thread, so forking while other threads run
+#(a refresh inside a serving worker) can leave a child stuck on a lock one of them held; those get a clean forkserver instead
+def pool_context():
+    if threading.active_count() > 1:
+        return multiprocessing.get_context('forkserver')
+    return None
+
+#Processes fetched pages into a dictionary of tables
+#Several pages are parsed in a process pool, since lxml and pandas hold the GIL while parsing
+def process_pages(pages, selected_tasks=tasks):
+    selected_tasks = [task for task in selected_tasks if task.name in pages]
+    if len(selected_tasks) < 2 or PARSE_PROCESSES < 2:
+        return {task.name: process_page(pages[task.name], task.layout) for task in selected_tasks}
+
+    with ProcessPoolExecutor(min(len(selected_tasks), PARSE_PROCESSES), mp_context=pool_context()) as executor:
+        tables = executor.map(
+            process_page,
+            [pages[task.name] for task in selected_tasks],
+            [task.layout for task in selected_tasks]
+        )
+        return {task.name: df for task, df in zip(selected_tasks, tables)}
 
 #Fetches all tables with multi-threading
 def get_processed_data():
-    with ThreadPoolExecutor() as executor:
-        processed_data_list = list(executor.map(fetch_and_process_data, tasks))
-
-    #Stores all tables in a dictionary
-    data_sources = {
-        'Headline CPI': processed_data_list[0],
-        'Core CPI': processed_data_list[1],
-        'Energy': processed_data_list[2],
-        'Gas': processed_data_list[3],
-        'Grocery': processed_data_list[4],
-        'Food': processed_data_list[5],
-        'Healthcare': processed_data_list[6],
-        'College': processed_data_list[7],
-        'Airline': processed_data_list[8]
-    }
-    
-    return data_sources
-    
-data_sources= get_processed_data()
+    return process_pages(fetch_pages())
+
+#Scrapes the selected tables and saves them, with the page hashes, as a new snapshot
+def scrape_snapshot(selected_tasks=tasks):
+    pages = fetch_pages(selected_tasks)
+    save_snapshot(process_pages(pages, selected_tasks), page_hashes={name: page_hash(html) for name, html in pages.items()})
+
+#Whether the snapshot at SNAPSHOT_PATH can be served as it is
+def snapshot_current(header):
+    return header['max_horizon'] == MAX_HORIZON and 'page_hashes' in header
+
+#Maps the local snapshot, scraping the eager categories first only when there isn't one yet
+#A snapshot built with a different MAX_HORIZON (or by an older version of the app) is rebuilt from its own rates
+#Workers booting together take turns under the snapshot lock, so one scrapes or rebuilds and the rest map its file
+def load_snapshot():
+    if os.path.exists(SNAPSHOT_PATH):
+        header, categories = map_snapshot()
+        if snapshot_current(header):
+            return header, categories
+
+    with snapshot_lock():
+        if not os.path.exists(SNAPSHOT_PATH):
+            scrape_snapshot([task for task in tasks if task.name in EAGER_CATEGORIES])
+        #Mapped again under the lock, so a category another worker just added is kept in the rebuild
+        header, categories = map_snapshot()
+        if not snapshot_current(header):
+            save_snapshot(to_data_sources(categories), page_hashes=header.get('page_hashes'))
+            header, categories = map_snapshot()
+    return header, categories
+
+#Running this file scrapes every table again and rebuilds the snapshot
+if __name__ == '__main__':
+    with snapshot_lock():
+        scrape_snapshot()
+    print('Saved snapshot to {}'.format(SNAPSHOT_PATH))
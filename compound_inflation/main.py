@@ -1,10 +1,22 @@
 import os
 
 from app import app
+import api
 import callbacks
+import compression
+import export
+import metrics
+import refresh
+import static_series
 
 server=app.server
 
+#Builds the default view of every loaded category before the first visitor asks for it
+callbacks.warm_figures()
+
+#Keeps the data current in the background when REFRESH_INTERVAL is set
+refresh.start()
+
 # Run the app
 if __name__ == '__main__':
     app.run_server(host='0.0.0.0', port=int(os.environ.get('PORT', 8051)))
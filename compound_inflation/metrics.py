@@ -0,0 +1,133 @@
+from bisect import bisect_left
+from collections import defaultdict
+import threading
+import time
+
+from flask import g, request
+
+from app import app
+import compression
+from series import current
+
+#Upper bounds (seconds) of the callback latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+#Where Dash sends every server-side callback
+CALLBACK_PATH = app.config.requests_pathname_prefix + '_dash-update-component'
+
+#Counts for one callback: a latency histogram and the bytes it received and sent
+class CallbackStats:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.count = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.errors = 0
+
+#Per-callback counts since this worker started; every gunicorn worker keeps its own
+_stats = defaultdict(CallbackStats)
+_lock = threading.Lock()
+
+#Name of the function behind a callback output; anything else is 'unknown' so clients can't add labels
+def callback_name(output):
+    callback = app.callback_map.get(output, {}).get('callback')
+    return getattr(callback, '__name__', 'unknown')
+
+@app.server.before_request
+def start_timer():
+    if request.path == CALLBACK_PATH:
+        g.callback_start = time.perf_counter()
+
+#Records the callback once Dash has answered; the request body was already parsed by Dash, so this only reads it
+def record_callback(response):
+    start = g.pop('callback_start', None)
+    if start is None:
+        return response
+    seconds = time.perf_counter() - start
+    body = request.get_json(silent=True) or {}
+    name = callback_name(body.get('output'))
+
+    with _lock:
+        stats = _stats[name]
+        stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.seconds += seconds
+        stats.count += 1
+        stats.request_bytes += request.content_length or 0
+        stats.response_bytes += response.content_length or 0
+        stats.errors += response.status_code >= 500
+    return response
+
+#Flask runs after_request hooks last registered first, so this goes to the front of the list to run after compress_response
+#and count the bytes actually sent
+app.server.after_request_funcs.setdefault(None, []).insert(0, record_callback)
+
+#One line of the Prometheus text format
+def sample(name, value, **labels):
+    if labels:
+        label_text = ','.join('{}="{}"'.format(key, str(label).replace('\\', '\\\\').replace('"', '\\"')) for key, label in labels.items())
+        return '{}{{{}}} {}'.format(name, label_text, value)
+    return '{} {}'.format(name, value)
+
+#Every metric in the Prometheus text format
+def render_metrics():
+    lines = []
+    with _lock:
+        stats = {name: vars(callback).copy() for name, callback in _stats.items()}
+
+    lines += ['# HELP compound_callback_duration_seconds Time to answer a Dash callback.',
+              '# TYPE compound_callback_duration_seconds histogram']
+    for name, callback in sorted(stats.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), callback['buckets']):
+            cumulative += count
+            lines.append(sample('compound_callback_duration_seconds_bucket', cumulative, callback=name, le=bound))
+        lines.append(sample('compound_callback_duration_seconds_sum', callback['seconds'], callback=name))
+        lines.append(sample('compound_callback_duration_seconds_count', callback['count'], callback=name))
+
+    for metric, key, description in [
+        ('compound_callback_request_bytes_total', 'request_bytes', 'Bytes of callback requests received.'),
+        ('compound_callback_response_bytes_total', 'response_bytes', 'Bytes of callback responses sent, after compression.'),
+        ('compound_callback_errors_total', 'errors', 'Callbacks answered with a server error.')
+    ]:
+        lines += ['# HELP {} {}'.format(metric, description), '# TYPE {} counter'.format(metric)]
+        lines += [sample(metric, callback[key], callback=name) for name, callback in sorted(stats.items())]
+
+    compressed = compression.stats()
+    for metric, value, description in [
+        ('compound_compressed_responses_total', compressed['responses'], 'Responses sent compressed.'),
+        ('compound_compression_bytes_in_total', compressed['bytes_in'], 'Bytes of those responses before compression.'),
+        ('compound_compression_bytes_out_total', compressed['bytes_out'], 'Bytes of those responses as sent.'),
+        ('compound_compression_bytes_saved_total', compressed['bytes_in'] - compressed['bytes_out'], 'Bytes compression kept off the wire.'),
+        ('compound_compression_cache_hits_total', compressed['cache']['hits'], 'Responses whose compressed bytes were already cached.'),
+        ('compound_compression_cache_misses_total', compressed['cache']['misses'], 'Responses compressed on the spot.')
+    ]:
+        lines += ['# HELP {} {}'.format(metric, description), '# TYPE {} counter'.format(metric), sample(metric, value)]
+
+    dataset = current()
+    cache = dataset.horizon_cache.stats()
+    figures = dataset.figure_cache.stats()
+    for metric, value, kind, description in [
+        ('compound_horizon_cache_hits_total', cache['hits'], 'counter', 'Long horizons served from the cache.'),
+        ('compound_horizon_cache_misses_total', cache['misses'], 'counter', 'Long horizons computed on request.'),
+        ('compound_horizon_cache_evictions_total', cache['evictions'], 'counter', 'Long horizons evicted to stay within the limit.'),
+        ('compound_horizon_cache_entries', cache['entries'], 'gauge', 'Long horizons in the cache.'),
+        ('compound_horizon_cache_bytes', cache['bytes'], 'gauge', 'Bytes held by the cache.'),
+        ('compound_horizon_cache_max_bytes', cache['max_bytes'], 'gauge', 'Size limit of the cache.'),
+        ('compound_figure_cache_hits_total', figures['hits'], 'counter', 'Figures served from the cache.'),
+        ('compound_figure_cache_misses_total', figures['misses'], 'counter', 'Figures built on request.'),
+        ('compound_figure_cache_evictions_total', figures['evictions'], 'counter', 'Figures evicted to stay within the limit.'),
+        ('compound_figure_cache_entries', figures['entries'], 'gauge', 'Figures in the cache.'),
+        ('compound_dataset_age_seconds', time.time() - dataset.created, 'gauge', 'Seconds since the dataset being served was built.'),
+        ('compound_dataset_categories_loaded', len(dataset.arrays), 'gauge', 'Categories loaded so far.')
+    ]:
+        lines += ['# HELP {} {}'.format(metric, description), '# TYPE {} {}'.format(metric, kind), sample(metric, value)]
+
+    lines += ['# HELP compound_dataset_info Version of the dataset being served.', '# TYPE compound_dataset_info gauge',
+              sample('compound_dataset_info', 1, version=dataset.version)]
+    return '\n'.join(lines) + '\n'
+
+#Prometheus scrape target
+@app.server.route(app.config.routes_pathname_prefix + 'metrics')
+def metrics():
+    return app.server.response_class(render_metrics(), mimetype='text/plain; version=0.0.4')
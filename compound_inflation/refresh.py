@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from app import app
+from cache import FigureCache, HorizonCache
+from load_tables import fetch_pages, page_hash, process_pages, tasks
+from series import FIGURE_CACHE_ENTRIES, HORIZON_CACHE_BYTES, Dataset, current, swap
+from snapshot import build_arrays, extend_arrays, extend_horizon, map_snapshot, snapshot_lock, write_snapshot
+import static_series
+
+logger = logging.getLogger(__name__)
+
+#Seconds between checks of the source pages; 0 turns the background refresh off
+REFRESH_INTERVAL = int(os.environ.get('REFRESH_INTERVAL', 0))
+
+#Splits the categories of a new snapshot into those whose rates didn't change and those that only gained months
+#Compared by content, so it holds for a snapshot another worker wrote as well as for one rebuilt here
+def compare_categories(old_dataset, categories):
+    unchanged, appended = set(), set()
+    for name, arrays in categories.items():
+        old_arrays = old_dataset.arrays.get(name)
+        if old_arrays is None:
+            continue
+        n = len(old_arrays['rates'])
+        same_start = (
+            len(arrays['rates']) >= n
+            and np.array_equal(arrays['dates'][:n], old_arrays['dates'])
+            and np.array_equal(arrays['rates'][:n], old_arrays['rates'], equal_nan=True)
+        )
+        if arrays is old_arrays or (same_start and len(arrays['rates']) == n):
+            unchanged.add(name)
+        elif same_start:
+            appended.add(name)
+    return unchanged, appended
+
+#Carries the cached long horizons over to the new dataset, extending those whose category only gained months
+def carry_over_cache(old_dataset, categories, unchanged, appended):
+    horizon_cache = HorizonCache(HORIZON_CACHE_BYTES)
+    for (data_source, years), values in old_dataset.horizon_cache.items():
+        if data_source in unchanged:
+            horizon_cache.put((data_source, years), values)
+        elif data_source in appended:
+            horizon_cache.put((data_source, years), extend_horizon(values, categories[data_source]['rates'], years))
+    return horizon_cache
+
+#Carries the cached figures over to the new dataset for the categories that didn't change
+def carry_over_figures(old_dataset, unchanged):
+    figure_cache = FigureCache(FIGURE_CACHE_ENTRIES)
+    for key, figure in old_dataset.figure_cache.items():
+        if key[0] in unchanged:
+            figure_cache.put(key, figure)
+    return figure_cache
+
+#The dataset of a newly mapped snapshot, keeping whatever the old dataset cached that still holds
+def carry_over(old_dataset, header, mapped):
+    unchanged, appended = compare_categories(old_dataset, mapped)
+    return Dataset(header, mapped, carry_over_cache(old_dataset, mapped, unchanged, appended), carry_over_figures(old_dataset, unchanged))
+
+#Re-fetches the pages of every loaded category and reprocesses only the ones whose content changed
+#Categories nobody has asked for yet stay unfetched; returns the new dataset, or None when nothing changed
+def rebuild(dataset):
+    pages = fetch_pages([task for task in tasks if task.name in dataset.arrays])
+    page_hashes = {name: page_hash(html) for name, html in pages.items()}
+    changed = [name for name, digest in page_hashes.items() if digest != dataset.page_hashes.get(name)]
+    if not changed:
+        return None
+
+    changed_tasks = [task for task in tasks if task.name in changed]
+    tables = process_pages({name: pages[name] for name in changed}, changed_tasks)
+
+    categories = dict(dataset.arrays)
+    for name, df in tables.items():
+        old_arrays = categories.get(name)
+        categories[name] = build_arrays(df) if old_arrays is None else extend_arrays(old_arrays, df)
+
+    #Saved even when only the page hashes moved (e.g. a layout change), so those pages aren't processed again
+    write_snapshot(categories, page_hashes=page_hashes)
+    header, mapped = map_snapshot()
+    logger.info('Refreshed %s; dataset version %s -> %s', ', '.join(changed), dataset.version, header['version'])
+    return carry_over(dataset, header, mapped)
+
+#One refresh cycle: adopt a newer snapshot another worker wrote, or fetch and rebuild if no one else is
+def refresh_once():
+    dataset = current()
+    header, mapped = map_snapshot()
+    if header['version'] != dataset.version:
+        swap(carry_over(dataset, header, mapped))
+        return
+
+    #Whoever holds the lock is already writing a snapshot; it gets picked up next cycle
+    with snapshot_lock(blocking=False) as locked:
+        if not locked:
+            return
+        #A category may have been added on demand since the check above
+        header, mapped = map_snapshot()
+        if header['version'] != dataset.version:
+            new_dataset = carry_over(dataset, header, mapped)
+        else:
+            new_dataset = rebuild(dataset)
+            #Prebuilt series follow the data once a deployment has built them
+            if new_dataset is not None and new_dataset.version != dataset.version and static_series.assets_built():
+                static_series.rebuild_assets(new_dataset)
+
+    #A single reference swap: requests already running keep the dataset they started with
+    if new_dataset is not None:
+        swap(new_dataset)
+
+#Runs refresh_once every REFRESH_INTERVAL seconds for the life of the process
+def refresh_forever():
+    while True:
+        time.sleep(REFRESH_INTERVAL)
+        try:
+            refresh_once()
+        except Exception:
+            logger.exception('Background refresh failed; serving the current dataset')
+
+#Process the refresher thread was started in; threads don't survive a fork, so a forked worker needs its own
+_refresh_pid = None
+_refresh_lock = threading.Lock()
+
+#Starts the refresher thread in this process unless it already runs here
+def ensure_running():
+    global _refresh_pid
+    if _refresh_pid == os.getpid():
+        return
+    with _refresh_lock:
+        if _refresh_pid != os.getpid():
+            threading.Thread(target=refresh_forever, name='refresh', daemon=True).start()
+            _refresh_pid = os.getpid()
+
+#Starts the background refresher (if enabled) on the first request each process serves, so only the processes answering
+#requests run one: not the gunicorn master with --preload, the parse and grid.py pools, or background callback jobs
+def start():
+    if REFRESH_INTERVAL <= 0:
+        return
+    app.server.before_request(ensure_running)
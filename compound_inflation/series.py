@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import FigureCache, HorizonCache
+from load_tables import fetch_page, find_task, load_snapshot, page_hash, process_page
+from snapshot import MAX_HORIZON, build_arrays, map_snapshot, snapshot_lock, to_data_sources, write_snapshot
+from utils import calculate_yoy
+
+#Size limit of each dataset's cache of horizons beyond MAX_HORIZON
+HORIZON_CACHE_BYTES = int(os.environ.get('HORIZON_CACHE_BYTES', 64 * 1024 * 1024))
+
+#Most finished figures each dataset keeps
+FIGURE_CACHE_ENTRIES = int(os.environ.get('FIGURE_CACHE_ENTRIES', 128))
+
+#Everything served from one snapshot. A refresh builds a new one and swaps it in whole,
+#so a request that holds a Dataset never sees half-updated data.
+class Dataset:
+    def __init__(self, header, arrays, horizon_cache=None, figure_cache=None):
+        self.version = header['version']
+        self.created = header['created']
+        self.page_hashes = header.get('page_hashes', {})
+        #Read-only arrays (dates, rates, horizons, price index) per category, shared by every worker through the page cache
+        self.arrays = arrays
+        self.data_sources = to_data_sources(arrays)
+
+        #Compounded rates for horizons 1..MAX_HORIZON, mapped from the snapshot
+        self.horizon_matrices = {source: category['horizons'] for source, category in arrays.items()}
+
+        #Horizons beyond the matrix, computed on demand and kept within HORIZON_CACHE_BYTES
+        self.horizon_cache = horizon_cache or HorizonCache(HORIZON_CACHE_BYTES)
+
+        #Figures built from this dataset; a new dataset starts with an empty one unless its figures still hold
+        self.figure_cache = figure_cache or FigureCache(FIGURE_CACHE_ENTRIES)
+
+        #Cumulative log price level per month, so inflation between any two months is one subtraction
+        self.price_indexes = {source: category['price_index'] for source, category in arrays.items()}
+
+        #Calendar year and month of every row, used to find rows without touching pandas
+        self.row_years = {source: df.index.year.to_numpy() for source, df in self.data_sources.items()}
+        self.row_months = {source: category['dates'] for source, category in arrays.items()}
+
+        #Every month any category covers, and where each category's rows fall among them, for comparing categories
+        self.aligned_sources = list(arrays)
+        self.aligned_months = np.unique(np.concatenate(list(self.row_months.values())))
+        self.aligned_years = self.aligned_months.astype('datetime64[Y]').astype(int) + 1970
+        self.aligned_rows = {source: np.searchsorted(self.aligned_months, months) for source, months in self.row_months.items()}
+
+        #One horizon of every category on the shared months, built on demand and kept within HORIZON_CACHE_BYTES
+        self.aligned_cache = HorizonCache(HORIZON_CACHE_BYTES)
+
+    #Returns the compounded rates of one horizon for every month of a category
+    def get_horizon(self, data_source, years):
+        if 1 <= years <= MAX_HORIZON:
+            return self.horizon_matrices[data_source][:, years - 1]
+
+        #Horizons beyond the matrix come from the cache instead of being added to the shared DataFrame
+        return self.horizon_cache.get(
+            (data_source, years),
+            lambda: calculate_yoy(self.data_sources[data_source], years).iloc[:, 0].to_numpy()
+        )
+
+    #One horizon of every category on the shared months, one column per category in aligned_sources
+    #Months a category doesn't cover are NaN; built once per horizon, so comparing more categories only takes more columns
+    def aligned_horizon(self, years):
+        def build():
+            matrix = np.full((len(self.aligned_months), len(self.aligned_sources)), np.nan)
+            for column, source in enumerate(self.aligned_sources):
+                matrix[self.aligned_rows[source], column] = self.get_horizon(source, years)
+            return matrix
+        return self.aligned_cache.get(years, build)
+
+    #Months from start_year through end_year and one horizon of each of the given categories over them
+    def compare_window(self, data_sources, years, start_year, end_year):
+        rows = slice(
+            np.searchsorted(self.aligned_years, start_year, side='left'),
+            np.searchsorted(self.aligned_years, end_year, side='right')
+        )
+        columns = [self.aligned_sources.index(source) for source in data_sources]
+        return self.aligned_months[rows], self.aligned_horizon(years)[rows, columns]
+
+    #Returns the row slice covering start_year through end_year
+    def year_slice(self, data_source, start_year, end_year):
+        years = self.row_years[data_source]
+        return slice(np.searchsorted(years, start_year, side='left'), np.searchsorted(years, end_year, side='right'))
+
+    #Returns the row slice covering the months from start to end (dates as text, e.g. a plot's axis range), one extra each side
+    def date_slice(self, data_source, start, end):
+        months = self.row_months[data_source]
+        first = np.searchsorted(months, np.datetime64(str(start)[:10], 'M'), side='left')
+        last = np.searchsorted(months, np.datetime64(str(end)[:10], 'M'), side='right')
+        return slice(max(first - 1, 0), last + 1)
+
+    #Returns the dates and requested horizons inside the year range as a DataFrame
+    def get_window(self, data_source, horizons, start_year, end_year):
+        rows = self.year_slice(data_source, start_year, end_year)
+        return pd.DataFrame(
+            {'{} Year'.format(years): self.get_horizon(data_source, years)[rows] for years in horizons},
+            index=self.data_sources[data_source].index[rows]
+        )
+
+    #Finds the row of a month ('YYYY-MM' or anything numpy reads as a month), or None if the category doesn't cover it
+    def month_position(self, data_source, month):
+        months = self.row_months[data_source]
+        month = np.datetime64(month, 'M')
+        pos = np.searchsorted(months, month)
+        if pos == len(months) or months[pos] != month:
+            return None
+        return pos
+
+    #Cumulative inflation (%) from start_month to end_month, looked up from the price index
+    def cumulative_inflation(self, data_source, start_month, end_month):
+        start_pos = self.month_position(data_source, start_month)
+        end_pos = self.month_position(data_source, end_month)
+        if start_pos is None or end_pos is None:
+            raise ValueError('{} has no data for one of those months'.format(data_source))
+        index = self.price_indexes[data_source]
+        return round(float(np.expm1(index[end_pos] - index[start_pos]) * 100), 1)
+
+    #Cumulative inflation (%) over the previous `months` months for every month of a category
+    def rolling_inflation(self, data_source, months):
+        index = self.price_indexes[data_source]
+        result = np.full(len(index), np.nan)
+        if 0 < months < len(index):
+            result[months:] = np.round(np.expm1(index[months:] - index[:-months]) * 100, 1)
+        return result
+
+#The dataset being served
+_current = Dataset(*load_snapshot())
+
+#Returns the dataset being served; take it once per request and use it throughout
+def current():
+    return _current
+
+#Functions run on every new dataset before it is served, such as building its default figures
+#Modules that import this one add themselves here
+before_swap = []
+
+#Replaces the dataset being served; requests already holding the old one finish with it
+def swap(dataset):
+    global _current
+    for hook in before_swap:
+        hook(dataset)
+    _current = dataset
+
+#Returns a dataset holding data_source, fetching and adding that one table the first time anyone asks for it
+#Raises KeyError for a category that isn't registered
+def dataset_for(data_source):
+    dataset = current()
+    if data_source in dataset.arrays:
+        return dataset
+    task = find_task(data_source)
+
+    #Another worker may have added it already; if not, this one fetches it while the others wait
+    with snapshot_lock():
+        header, mapped = map_snapshot()
+        if data_source not in mapped:
+            html = fetch_page(task.url)
+            categories = dict(mapped)
+            categories[data_source] = build_arrays(process_page(html, task.layout))
+            write_snapshot(categories, page_hashes=dict(header['page_hashes'], **{data_source: page_hash(html)}))
+            header, mapped = map_snapshot()
+
+    #Requests that raced here all end up serving the same snapshot
+    dataset = current()
+    if data_source not in dataset.arrays:
+        #The cached long horizons and figures still hold as long as the categories already served didn't change underneath
+        unchanged = all(
+            name in mapped and np.array_equal(arrays['rates'], mapped[name]['rates'], equal_nan=True)
+            for name, arrays in dataset.arrays.items()
+        )
+        if unchanged:
+            dataset = Dataset(header, mapped, dataset.horizon_cache, dataset.figure_cache)
+        else:
+            dataset = Dataset(header, mapped)
+        swap(dataset)
+    return dataset
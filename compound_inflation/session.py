@@ -0,0 +1,135 @@
+from collections import OrderedDict
+import copy
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+import dash
+
+#Where the stores' values are kept: unset leaves them in the browser, 'memory' keeps them in this process
+#(so only with a single worker) and anything else is a directory shared by every worker on the machine
+SESSION_STORE = os.environ.get('SESSION_STORE', '')
+
+#Seconds a session file is kept after it was last used; older ones are deleted
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 30 * 24 * 3600))
+
+#Seconds between sweeps of a session directory for expired files, per process
+PRUNE_INTERVAL = 3600
+
+#Most sessions kept in memory; the least recently used are dropped first
+MAX_MEMORY_SESSIONS = 10000
+
+#Keys are only ever made by save, so anything else sent by a browser is ignored
+KEY_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+#Sessions held by this process, as JSON so callers never share one object
+class MemorySessions:
+    def __init__(self, max_sessions=MAX_MEMORY_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._sessions.get(key)
+            if value is None:
+                return None
+            self._sessions.move_to_end(key)
+        return json.loads(value)
+
+    def set(self, key, value):
+        value = json.dumps(value)
+        with self._lock:
+            self._sessions[key] = value
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+#Sessions saved as one JSON file each, so every worker on the machine sees them
+#A file's mtime is when it was last used; files unused for longer than ttl seconds are deleted
+class FileSessions:
+    def __init__(self, directory, ttl=SESSION_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._pruned = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path) as f:
+                value = json.load(f)
+            #Reading a session counts as using it
+            os.utime(path)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    #Written next to the old file and swapped in, so a reader never sees half a session
+    #The temporary name carries the process and the thread, since thread idents repeat across forked workers
+    def set(self, key, value):
+        temp_path = '{}.{}.{}.tmp'.format(self.path(key), os.getpid(), threading.get_ident())
+        with open(temp_path, 'w') as f:
+            json.dump(value, f)
+        os.replace(temp_path, self.path(key))
+        self.prune()
+
+    #Deletes the files of expired sessions, at most once every PRUNE_INTERVAL seconds
+    #Leftover temporary files from a crashed write go the same way
+    def prune(self):
+        now = time.time()
+        if now - self._pruned < PRUNE_INTERVAL:
+            return
+        self._pruned = now
+        for entry in os.scandir(self.directory):
+            try:
+                if now - entry.stat().st_mtime > self.ttl:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+#The configured store, or None when the browser keeps everything
+def make_sessions(setting=SESSION_STORE):
+    if not setting:
+        return None
+    if setting == 'memory':
+        return MemorySessions()
+    return FileSessions(setting)
+
+sessions = make_sessions()
+
+#Whether a store's browser value is a session key rather than the value itself
+def is_session(stored):
+    return isinstance(stored, dict) and isinstance(stored.get('session'), str) and bool(KEY_PATTERN.fullmatch(stored['session']))
+
+#The value a store stands for: what the browser holds, or what was saved under its session key
+#A session that can no longer be found (evicted, or saved by another machine) starts over from default
+def load(stored, default):
+    if not is_session(stored):
+        #A copy, so a caller changing the value can still compare it with what the store holds
+        return copy.deepcopy(default if stored is None else stored)
+    value = sessions.get(stored['session']) if sessions is not None else None
+    return copy.deepcopy(default) if value is None else value
+
+#What a store's browser value becomes when its value changes: the value itself, or only the session key
+#The revision changes on every save so callbacks listening to the store still fire
+#A value equal to what the store already stands for isn't saved again, so a visit that changes nothing writes nothing
+def save(stored, value, default):
+    if sessions is None:
+        return value
+    if value == load(stored, default):
+        return dash.no_update
+    if is_session(stored):
+        key, revision = stored['session'], stored.get('revision', 0) + 1
+    else:
+        key, revision = uuid.uuid4().hex, 1
+    sessions.set(key, value)
+    return {'session': key, 'revision': revision}
@@ -0,0 +1,171 @@
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import compound_matrix, compound_rates, extend_log_price_index, log_price_index
+
+#Where the processed tables are saved so workers can start without scraping
+SNAPSHOT_PATH = os.environ.get(
+    'SNAPSHOT_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'snapshot.bin')
+)
+
+#Held by whichever worker is writing the snapshot
+LOCK_PATH = SNAPSHOT_PATH + '.lock'
+
+#Longest horizon precomputed for every category (months x MAX_HORIZON float64 per category)
+MAX_HORIZON = int(os.environ.get('MAX_HORIZON', 100))
+
+#Arrays start on 64 byte boundaries so every mapped view is aligned
+ALIGNMENT = 64
+
+#Builds every array stored for one category
+def build_arrays(df, max_horizon=MAX_HORIZON):
+    rates = df['1 Year'].to_numpy(dtype=float)
+    horizons = compound_matrix(rates, max_horizon)
+    #The 1 year line is the source rate itself
+    horizons[:, 0] = rates
+    return {
+        'dates': df.index.to_numpy().astype('datetime64[M]'),
+        'rates': rates,
+        'horizons': horizons,
+        'price_index': log_price_index(rates)
+    }
+
+#Whether a freshly processed table keeps every month already in arrays unchanged (it may add later ones)
+def only_appends(arrays, df):
+    dates = df.index.to_numpy().astype('datetime64[M]')
+    rates = df['1 Year'].to_numpy(dtype=float)
+    n = len(arrays['rates'])
+    return (
+        len(rates) >= n
+        and np.array_equal(dates[:n], arrays['dates'])
+        and np.array_equal(rates[:n], arrays['rates'], equal_nan=True)
+    )
+
+#Extends a category's arrays when the new table only appends months, recomputing just the new rows
+#Returns the old arrays when nothing changed and rebuilds everything when earlier months were revised
+def extend_arrays(arrays, df, max_horizon=MAX_HORIZON):
+    if not only_appends(arrays, df):
+        return build_arrays(df, max_horizon)
+
+    dates = df.index.to_numpy().astype('datetime64[M]')
+    rates = df['1 Year'].to_numpy(dtype=float)
+    n = len(arrays['rates'])
+    if len(rates) == n:
+        return arrays
+
+    #A new month only looks back max_horizon years
+    new_rows = len(rates) - n
+    new_horizons = compound_matrix(rates[-(new_rows + 12 * max_horizon):], max_horizon)[-new_rows:]
+    new_horizons[:, 0] = rates[-new_rows:]
+    return {
+        'dates': dates,
+        'rates': rates,
+        'horizons': np.concatenate([arrays['horizons'], new_horizons]),
+        'price_index': extend_log_price_index(arrays['price_index'], rates)
+    }
+
+#Extends one horizon computed beyond the matrix by the months appended since it was computed
+def extend_horizon(values, rates, years):
+    new_rows = len(rates) - len(values)
+    if new_rows <= 0:
+        return values
+    new_values = compound_rates(rates[-(new_rows + 12 * years):], [years])[-new_rows:, 0]
+    return np.concatenate([values, new_values])
+
+#Short hash of the source tables; it changes exactly when the data does
+def dataset_version(categories):
+    digest = hashlib.sha256()
+    for name, arrays in categories.items():
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(arrays['dates']).tobytes())
+        digest.update(np.ascontiguousarray(arrays['rates']).tobytes())
+    return digest.hexdigest()[:16]
+
+#Builds and saves every array for freshly processed tables
+def save_snapshot(data_sources, path=SNAPSHOT_PATH, max_horizon=MAX_HORIZON, page_hashes=None):
+    categories = {name: build_arrays(df, max_horizon) for name, df in data_sources.items()}
+    write_snapshot(categories, path, max_horizon, page_hashes)
+
+#Writes every category's arrays into one flat file: an 8 byte header length, a JSON header, then the raw arrays
+#page_hashes records which version of each source page the arrays were built from
+def write_snapshot(categories, path=SNAPSHOT_PATH, max_horizon=MAX_HORIZON, page_hashes=None):
+    names = list(categories)
+    arrays = {}
+    for i, category_arrays in enumerate(categories.values()):
+        for key, array in category_arrays.items():
+            arrays['{}/{}'.format(i, key)] = np.ascontiguousarray(array)
+
+    #Offsets are relative to the end of the header
+    layout = {}
+    offset = 0
+    for key, array in arrays.items():
+        offset += -offset % ALIGNMENT
+        layout[key] = {'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({
+        'names': names,
+        'version': dataset_version(categories),
+        'created': time.time(),
+        'max_horizon': max_horizon,
+        'page_hashes': page_hashes or {},
+        'arrays': layout
+    }).encode()
+    header += b' ' * (-(8 + len(header)) % ALIGNMENT)
+
+    #Written next to the old snapshot and swapped in, so a reader never sees half a file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        start = f.tell()
+        for key, array in arrays.items():
+            f.write(b'\0' * (start + layout[key]['offset'] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(temp_path, path)
+
+#Serializes snapshot writers across workers; with blocking=False it yields False instead of waiting
+@contextmanager
+def snapshot_lock(blocking=True):
+    os.makedirs(os.path.dirname(os.path.abspath(LOCK_PATH)), exist_ok=True)
+    with open(LOCK_PATH, 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+#Memory-maps a snapshot read-only and returns its header and arrays; every worker mapping the same file shares its pages
+def map_snapshot(path=SNAPSHOT_PATH):
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    header_length = int.from_bytes(mapped[:8].tobytes(), 'little')
+    header = json.loads(mapped[8:8 + header_length].tobytes())
+    start = 8 + header_length
+
+    categories = {}
+    for i, name in enumerate(header['names']):
+        categories[name] = {}
+        for key in ('dates', 'rates', 'horizons', 'price_index'):
+            spec = header['arrays']['{}/{}'.format(i, key)]
+            dtype = np.dtype(spec['dtype'])
+            begin = start + spec['offset']
+            end = begin + dtype.itemsize * int(np.prod(spec['shape']))
+            categories[name][key] = mapped[begin:end].view(dtype).reshape(spec['shape'])
+    return header, categories
+
+#Wraps mapped arrays in the DataFrame shape the rest of the app uses, without copying the rates
+def to_data_sources(categories):
+    data_sources = {}
+    for name, arrays in categories.items():
+        dates = pd.DatetimeIndex(arrays['dates'].astype('datetime64[ns]'), name='Date')
+        data_sources[name] = pd.DataFrame(arrays['rates'].reshape(-1, 1), index=dates, columns=['1 Year'], copy=False)
+    return data_sources
@@ -0,0 +1,163 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+
+from flask import abort, request, send_file
+import numpy as np
+import plotly.graph_objs as go
+from werkzeug.utils import safe_join
+
+from app import app
+from callbacks import WEBGL_POINTS, style_figure
+from load_tables import category_names
+from series import current, dataset_for
+
+#Brotli is optional; without it only gzip copies are written
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#Where the prebuilt series go: inside Dash's assets folder, so a CDN or static file server can serve them as they are
+SERIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'series')
+
+#Says which dataset version the page should read; the only file that changes in place
+MANIFEST_FILE = 'manifest.json'
+
+#Horizons prebuilt for every category unless told otherwise; longer ones are drawn by the server
+DEFAULT_HORIZONS = 50
+
+#Versions kept on disk, so pages opened before a rebuild can still fetch theirs
+KEEP_VERSIONS = 2
+
+#Rates are rounded to this many decimals, far below what the plot can show, to keep the files small
+DECIMALS = 4
+
+#Names of the prebuilt version folders, which are dataset versions
+VERSION_PATTERN = re.compile(r'[0-9a-f]{16}')
+
+#Folder name of a category, e.g. 'headline-cpi'
+def category_slug(data_source):
+    return re.sub(r'[^a-z0-9]+', '-', data_source.lower()).strip('-')
+
+#One horizon of a category as compact JSON: the first month and a value per row (null where there is none)
+#Months are listed as offsets from the first one only when the table skips some
+def series_payload(dataset, data_source, years):
+    months = dataset.row_months[data_source]
+    values = np.round(dataset.get_horizon(data_source, years), DECIMALS)
+    payload = {
+        'start': str(months[0]),
+        'values': [None if np.isnan(value) else value for value in values.tolist()]
+    }
+    offsets = (months - months[0]).astype(int)
+    if offsets[-1] != len(offsets) - 1:
+        payload['months'] = offsets.tolist()
+    return payload
+
+#Writes text to path along with a gzip (and, when available, brotli) copy, so servers can send them without compressing
+def write_compressed(path, text):
+    data = text.encode()
+    copies = [('', data), ('.gz', gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        copies.append(('.br', brotli.compress(data)))
+    for suffix, body in copies:
+        with open(path + suffix, 'wb') as f:
+            f.write(body)
+
+#What the page reads first: the version folder, the categories and horizons it holds and the plot's layout
+def make_manifest(dataset, data_sources, horizons):
+    fig = go.Figure()
+    style_figure(fig, None)
+    return {
+        'version': dataset.version,
+        'base': dataset.version + '/',
+        'horizons': horizons,
+        'webgl_points': WEBGL_POINTS,
+        'categories': {data_source: category_slug(data_source) for data_source in data_sources},
+        'layout': fig.to_plotly_json()['layout']
+    }
+
+#Drops all but the newest KEEP_VERSIONS version folders
+def prune_versions(directory, keep=KEEP_VERSIONS):
+    versions = [name for name in os.listdir(directory) if VERSION_PATTERN.fullmatch(name)]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(directory, name)), reverse=True)
+    for name in versions[keep:]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+#Writes horizons 1..horizons of the dataset's categories under a folder named after its version, then points the manifest at it
+#The folder is written under a temporary name and renamed, so a page never reads a half-written version
+def write_assets(dataset, directory=SERIES_DIR, horizons=DEFAULT_HORIZONS, data_sources=None):
+    data_sources = [name for name in data_sources or category_names if name in dataset.arrays]
+    version_dir = os.path.join(directory, dataset.version)
+    temp_dir = version_dir + '.tmp'
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    for data_source in data_sources:
+        category_dir = os.path.join(temp_dir, category_slug(data_source))
+        os.makedirs(category_dir)
+        for years in range(1, horizons + 1):
+            payload = series_payload(dataset, data_source, years)
+            write_compressed(os.path.join(category_dir, '{}.json'.format(years)), json.dumps(payload, separators=(',', ':')))
+    #Building the same version again (say, with more horizons) replaces the old folder
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(temp_dir, version_dir)
+
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    write_compressed(manifest_path + '.tmp', json.dumps(make_manifest(dataset, data_sources, horizons), separators=(',', ':')))
+    for suffix in ('', '.gz', '.br'):
+        if os.path.exists(manifest_path + '.tmp' + suffix):
+            os.replace(manifest_path + '.tmp' + suffix, manifest_path + suffix)
+        elif os.path.exists(manifest_path + suffix):
+            #A copy this build didn't write (brotli since uninstalled) would point at an old version
+            os.remove(manifest_path + suffix)
+    prune_versions(directory)
+    return version_dir
+
+#Whether the series have been prebuilt here, in which case a refresh rebuilds them for the new dataset
+def assets_built(directory=SERIES_DIR):
+    return os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+#Rebuilds the series for a new dataset with the same horizons and categories as the current build
+def rebuild_assets(dataset, directory=SERIES_DIR):
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    return write_assets(dataset, directory, manifest['horizons'], list(manifest['categories']))
+
+#Serves the prebuilt series when gunicorn is the one answering, with the precompressed copy the browser accepts
+#Version folders never change, so browsers and CDNs may keep them for good; the manifest is checked every time
+@app.server.route(app.config.routes_pathname_prefix + app.config.assets_url_path.strip('/') + '/series/<path:path>')
+def serve_series(path):
+    full_path = safe_join(SERIES_DIR, path)
+    if full_path is None or not full_path.endswith('.json') or not os.path.isfile(full_path):
+        abort(404)
+
+    encoding = None
+    for suffix, name in (('.br', 'br'), ('.gz', 'gzip')):
+        if name in request.accept_encodings and os.path.isfile(full_path + suffix):
+            full_path, encoding = full_path + suffix, name
+            break
+
+    response = send_file(full_path, mimetype='application/json', conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    if path == MANIFEST_FILE:
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+#Running this file fetches every category and prebuilds its series into the assets folder
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prebuild every category\'s series as precompressed JSON in the assets folder.')
+    parser.add_argument('--horizons', type=int, default=DEFAULT_HORIZONS, help='prebuild horizons 1 through this many years')
+    parser.add_argument('--dir', default=SERIES_DIR)
+    args = parser.parse_args()
+
+    for data_source in category_names:
+        dataset_for(data_source)
+    version_dir = write_assets(current(), args.dir, args.horizons)
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(version_dir) for name in names)
+    print('Wrote {} ({} bytes with compressed copies)'.format(version_dir, size))
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from cache import HorizonCache
+
+#An array of n float64 values, n * 8 bytes
+def array(n, value=0.0):
+    return np.full(n, value)
+
+def test_evicts_least_recently_used_to_fit_the_byte_limit():
+    cache = HorizonCache(max_bytes=3 * 80)
+    for key in 'abc':
+        cache.get(key, lambda: array(10))
+    #Using 'a' makes 'b' the least recently used
+    cache.get('a', lambda: array(10))
+    cache.get('d', lambda: array(10))
+
+    assert [key for key, _ in cache.items()] == ['c', 'a', 'd']
+    assert 'b' not in cache
+    stats = cache.stats()
+    assert stats['bytes'] == 240
+    assert stats['entries'] == 3
+    assert stats['evictions'] == 1
+
+def test_put_replacing_a_key_counts_only_the_new_value():
+    cache = HorizonCache(max_bytes=1000)
+    cache.put('a', array(10))
+    cache.put('a', array(20, 1.0))
+    cache.put('b', array(5))
+
+    assert cache.stats()['bytes'] == 20 * 8 + 5 * 8
+    assert cache.get('a', lambda: array(1))[0] == 1.0
+    #Replacing makes the key the most recently used
+    assert [key for key, _ in cache.items()] == ['b', 'a']
+
+def test_values_bigger_than_the_cache_are_returned_but_not_kept():
+    cache = HorizonCache(max_bytes=80)
+    cache.put('small', array(5))
+    assert len(cache.get('big', lambda: array(11))) == 11
+
+    assert 'big' not in cache
+    assert 'small' in cache
+    assert cache.stats()['bytes'] == 40
+
+def test_cached_arrays_are_read_only():
+    cache = HorizonCache(max_bytes=1000)
+    values = cache.get('a', lambda: array(10))
+    with pytest.raises(ValueError):
+        values[0] = 1.0
+
+def test_concurrent_misses_compute_once():
+    cache = HorizonCache(max_bytes=1000)
+    started = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        #Long enough for the second thread to find the computation pending
+        time.sleep(0.2)
+        return array(10, 2.0)
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get('a', compute)))
+    first.start()
+    started.wait()
+    second = threading.Thread(target=lambda: results.append(cache.get('a', compute)))
+    second.start()
+    first.join()
+    second.join()
+
+    assert len(calls) == 1
+    assert len(results) == 2 and results[0] is results[1]
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+def test_failed_compute_reaches_waiters_and_is_retried():
+    cache = HorizonCache(max_bytes=1000)
+    started = threading.Event()
+
+    def compute():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError('failed')
+
+    errors = []
+    def get():
+        try:
+            cache.get('a', compute)
+        except RuntimeError as error:
+            errors.append(error)
+
+    first = threading.Thread(target=get)
+    first.start()
+    started.wait()
+    second = threading.Thread(target=get)
+    second.start()
+    first.join()
+    second.join()
+
+    assert [str(error) for error in errors] == ['failed', 'failed']
+    assert cache._pending == {}
+    assert 'a' not in cache
+    #Nothing was kept, so the next call computes again
+    assert cache.get('a', lambda: array(3)).shape == (3,)
+
+def test_counts_hits_and_misses():
+    cache = HorizonCache(max_bytes=1000)
+    cache.get('a', lambda: array(1))
+    cache.get('a', lambda: array(1))
+    cache.get('a', lambda: array(1))
+    cache.get('b', lambda: array(1))
+    #Membership checks count as neither
+    assert 'a' in cache
+
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 2
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fixtures import FIXTURES_DIR
+from load_tables import page_file, process_page, read_first_table, tasks
+
+#The per-category processing functions the declarative layouts replaced, kept here as the reference their output must match
+def make_usable_old(df):
+    df=df.melt(id_vars='Year', var_name='Month', value_name='YoY')
+    df.dropna(inplace=True)
+    df=df[df['Month']!='Ave']
+    df['Date']=df['Year'].astype('str')+df['Month']
+    df['Date']=pd.to_datetime(df['Date'], format='%Y%b')
+    df=df[~df['YoY'].astype('str').str.contains('Avail.')][['Date', 'YoY']]
+    df['YoY']=[float(x) for x in df['YoY']]
+    df.rename(columns={'YoY': '1 Year'}, inplace=True)
+    df.sort_values('Date', inplace=True, ignore_index=True)
+    df.set_index('Date', inplace=True)
+    return df
+
+def process_mi(mi):
+    return make_usable_old(mi)
+
+def process_ci(ci):
+    ci.columns=ci.iloc[len(ci)-1]
+    ci=ci[:-1]
+    return make_usable_old(ci)
+
+def process_ei(ei):
+    ei.columns=ei.iloc[0]
+    ei=ei[1:]
+    return make_usable_old(ei)
+
+def process_ga(ga):
+    ga.columns=ga.iloc[0]
+    ga=ga[1:]
+    ga.columns=ga.columns.str.capitalize()
+    return make_usable_old(ga)
+
+def process_gi(gi):
+    gi.columns=gi.iloc[0]
+    gi=gi[1:]
+    return make_usable_old(gi)
+
+def process_fi(fi):
+    return make_usable_old(fi)
+
+def process_hi(hi):
+    hi.columns=hi.iloc[0]
+    hi=hi[1:]
+    return make_usable_old(hi)
+
+def process_co(co):
+    co.columns=co.iloc[0]
+    co=co[1:]
+    co=co.melt(id_vars='Year', var_name='Month', value_name='YoY')
+    huh=co[(co['Month']=='Jan')&(co['Year']=='1978')]['YoY'].values[0]
+    co=co[co['YoY']!=huh]
+    co.dropna(inplace=True)
+    co=co[co['Month']!='Ave']
+    co['Date']=co['Year'].astype('str')+co['Month']
+    co['Date']=pd.to_datetime(co['Date'], format='%Y%b')
+    co=co[~co['YoY'].astype('str').str.contains('Avail.')][['Date', 'YoY']]
+    co['YoY']=[float(x) for x in co['YoY']]
+    co.rename(columns={'YoY':'1 Year'}, inplace=True)
+    co.sort_values('Date', inplace=True, ignore_index=True)
+    co.set_index('Date', inplace=True)
+    return co
+
+def process_ai(ai):
+    ai.columns=ai.iloc[0]
+    ai=ai[1:]
+    ai=ai[ai['Year'].astype('int')>=1970]
+    return make_usable_old(ai)
+
+OLD_PROCESSING = {
+    'Headline CPI': process_mi,
+    'Core CPI': process_ci,
+    'Energy': process_ei,
+    'Gas': process_ga,
+    'Grocery': process_gi,
+    'Food': process_fi,
+    'Healthcare': process_hi,
+    'College': process_co,
+    'Airline': process_ai
+}
+
+#The saved page of a category
+def fixture_page(task):
+    with open(os.path.join(FIXTURES_DIR, page_file(task.url)), encoding='utf-8') as f:
+        return f.read()
+
+def test_every_category_has_a_reference():
+    assert set(OLD_PROCESSING) == {task.name for task in tasks}
+
+@pytest.mark.parametrize('task', tasks, ids=[task.name for task in tasks])
+def test_layout_matches_old_processing(task):
+    html = fixture_page(task)
+    expected = OLD_PROCESSING[task.name](read_first_table(html))
+    result = process_page(html, task.layout)
+
+    assert list(result.columns) == ['1 Year']
+    assert result.index.name == 'Date'
+    np.testing.assert_array_equal(result.index.to_numpy(), expected.index.to_numpy())
+    np.testing.assert_array_equal(result['1 Year'].to_numpy(dtype=float), expected['1 Year'].to_numpy(dtype=float))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import calculate_yoy, compound_matrix
+
+#Longest horizon compared against the old implementation
+MAX_YEARS = 120
+
+#The row-wise implementation calculate_yoy replaced, kept here as the reference its output must match
+def calculate_yoy_apply(df_ref, years):
+    cols_to_multiply = [df_ref['1 Year']]
+    for i in range(1, years):
+        cols_to_multiply.append(df_ref['1 Year'].shift(i * 12).rename(f'Offset_{i}_Year'))
+    df_with_shifted = pd.concat(cols_to_multiply, axis=1)
+    total = df_with_shifted.apply(lambda x: np.prod((x / 100) + 1) if all(~np.isnan(x)) else np.nan, axis=1)
+    return ((total - 1) * 100).round(1).astype(float)
+
+#A monthly table of one-decimal YoY rates like the scraped ones, with a few gaps
+def make_table(seed, months, gaps=3):
+    rng = np.random.default_rng(seed)
+    rates = np.round(rng.normal(3, 4, months), 1)
+    for start in rng.integers(0, months, gaps):
+        rates[start:start + rng.integers(1, 14)] = np.nan
+    index = pd.date_range('1914-01-01', periods=months, freq='MS', name='Date')
+    return pd.DataFrame({'1 Year': rates}, index=index)
+
+#Rates whose products land exactly on a rounding tie: 1.1 * 0.965 = 1.0615 and 1.05 * 1.01 = 1.0605
+def make_tie_table():
+    rates = np.tile([10.0, 5.0, 2.0, -3.5, 1.0, 0.5, 0.0, 3.0, 4.0, 6.1, 7.0, 8.0], 40)
+    rates[12:24] = [-3.5, 1.0, 2.0, 10.0, 5.0, 0.5, 0.0, 3.0, 4.0, 6.1, 7.0, 8.0]
+    index = pd.date_range('1914-01-01', periods=len(rates), freq='MS', name='Date')
+    return pd.DataFrame({'1 Year': rates}, index=index)
+
+TABLES = [make_table(seed, months) for seed, months in [(0, 720), (1, 413), (2, 97)]] + [make_tie_table()]
+
+@pytest.mark.parametrize('df', TABLES)
+def test_calculate_yoy_matches_apply(df):
+    for years in range(1, MAX_YEARS + 1):
+        expected = calculate_yoy_apply(df, years)
+        result = calculate_yoy(df, years)[f'Compounded_YoY_{years}']
+        np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy(), err_msg=f'{years} years')
+
+@pytest.mark.parametrize('df', TABLES)
+def test_compound_matrix_matches_calculate_yoy(df):
+    matrix = compound_matrix(df['1 Year'].to_numpy(), MAX_YEARS)
+    for years in range(1, MAX_YEARS + 1):
+        np.testing.assert_array_equal(matrix[:, years - 1], calculate_yoy(df, years).iloc[:, 0].to_numpy())
+
+#Horizons under one year only ever covered the current month
+def test_calculate_yoy_short_horizon_is_one_year():
+    df = TABLES[0]
+    np.testing.assert_array_equal(calculate_yoy(df, 0).iloc[:, 0].to_numpy(), calculate_yoy(df, 1).iloc[:, 0].to_numpy())
@@ -3,35 +3,116 @@ from math import fmod
 import numpy as np
 import pandas as pd
 
+#Sums every value with the same month of the previous (years - 1) years, for each horizon, in one vectorized pass
+def same_month_window_sums(values, horizons):
+    values = np.asarray(values, dtype=float)
+    windows = np.atleast_1d(horizons) * 12
+    n = len(values)
+
+    #Rows are laid out 12 per year, so a running sum down each column accumulates the same month across years
+    pad = (-n) % 12
+    missing = np.isnan(values)
+    filled = np.concatenate([np.where(missing, 0.0, values), np.zeros(pad)])
+    missing_count = np.concatenate([missing.astype(np.int64), np.zeros(pad, dtype=np.int64)])
+    running = filled.reshape(-1, 12).cumsum(axis=0).ravel()[:n]
+    running_missing = missing_count.reshape(-1, 12).cumsum(axis=0).ravel()[:n]
+
+    #Subtracting the running sum from one window earlier leaves only the last `years` entries
+    rows = np.arange(n)[:, None]
+    earlier = rows - windows[None, :]
+    has_earlier = earlier >= 0
+    earlier = np.where(has_earlier, earlier, 0)
+    totals = running[:, None] - np.where(has_earlier, running[earlier], 0.0)
+    totals_missing = running_missing[:, None] - np.where(has_earlier, running_missing[earlier], 0)
+
+    #Same as the shifted columns: any gap or a window reaching before the first row gives NaN
+    totals[(totals_missing > 0) | (rows < windows[None, :] - 12)] = np.nan
+    return totals
+
+#Compounds YoY percentage rates over each of the given horizons (one column per horizon)
+def compound_rates(rates, horizons):
+    rates = np.asarray(rates, dtype=float)
+    horizons = np.atleast_1d(horizons)
+    compounded = np.expm1(same_month_window_sums(np.log1p(rates / 100), horizons)) * 100
+
+    #Values landing on a rounding tie (e.g. 6.05) round by floating point noise, so those few are multiplied out directly
+    near_tie = np.abs(np.abs(compounded * 10) % 1 - 0.5) < 1e-6
+    for pos, col in zip(*np.nonzero(near_tie)):
+        same_months = rates[pos - (horizons[col] - 1) * 12:pos + 1:12][::-1]
+        compounded[pos, col] = (np.prod((same_months / 100) + 1) - 1) * 100
+
+    return np.round(compounded, 1)
+
+#Builds the months x horizons (1..max_years) matrix of compounded rates
+def compound_matrix(rates, max_years):
+    return compound_rates(rates, np.arange(1, max_years + 1))
+
+#Builds a log price level for every month by chaining each month's YoY rate onto the same month a year earlier
+#The first 12 months have no earlier year to chain from, so each one starts from January as if its own YoY rate had held steadily
+#Spans that are whole years are exact; other spans carry that first-year approximation
+def log_price_index(rates):
+    log_growth = np.log1p(np.asarray(rates, dtype=float) / 100)
+    #Missing months are treated as no change rather than breaking the chain
+    log_growth = np.where(np.isnan(log_growth), 0.0, log_growth)
+    n = len(log_growth)
+
+    seed = log_growth[:12] * np.arange(min(n, 12)) / 12
+    chained = log_growth.copy()
+    chained[:12] = seed
+    pad = (-n) % 12
+    chained = np.concatenate([chained, np.zeros(pad)])
+    return chained.reshape(-1, 12).cumsum(axis=0).ravel()[:n]
+
+#Chains the months appended to rates onto an existing log price index
+def extend_log_price_index(log_index, rates):
+    n = len(log_index)
+    if n < 12:
+        return log_price_index(rates)
+
+    log_growth = np.log1p(np.asarray(rates, dtype=float) / 100)
+    log_growth = np.where(np.isnan(log_growth), 0.0, log_growth)
+    extended = np.concatenate([log_index, np.zeros(len(log_growth) - n)])
+    #Usually a single new month, so a plain loop is fine
+    for t in range(n, len(extended)):
+        extended[t] = extended[t - 12] + log_growth[t]
+    return extended
+
 #Calculates cumulative interest rates based on the input year
 def calculate_yoy(df_ref, years):
-    # Create an empty DataFrame to store the YoY calculations
-    result = pd.DataFrame(index=df_ref.index, columns=[f'Compounded_YoY_{years}'])
-    
-    # Create a list to hold the values for each year
-    cols_to_multiply = [df_ref['1 Year']]
-    
-    # Generate a date range for each year to look back, accounting for monthly data
-    for i in range(1, years):
-        shifted_col = df_ref['1 Year'].shift(i * 12)
-        cols_to_multiply.append(shifted_col.rename(f'Offset_{i}_Year'))
-    
-    # Concatenate the columns into one DataFrame
-    df_with_shifted = pd.concat(cols_to_multiply, axis=1)
+    #Horizons under one year only ever covered the current month
+    years = max(int(years), 1)
+    compounded = compound_rates(df_ref['1 Year'].to_numpy(dtype=float), [years])
+    return pd.DataFrame({f'Compounded_YoY_{years}': compounded[:, 0]}, index=df_ref.index)
     
-    # Calculate the compounded YoY change
-    df_with_shifted['Total'] = df_with_shifted.apply(
-        lambda x: np.prod((x / 100) + 1) if all(~np.isnan(x)) else np.nan, axis=1
-    )
+#Indices of the points worth drawing when a series has more than `budget` of them
+#Keeps the lowest and highest point of each bucket so peaks (e.g. 1920 and 1980) survive, and the points
+#on both sides of every gap so missing months still show as gaps
+def minmax_indices(values, budget):
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n <= budget:
+        return np.arange(n)
 
-    # Convert the total change to percentage and round off
-    result[f'Compounded_YoY_{years}'] = ((df_with_shifted['Total'] - 1) * 100).round(1)
-    
-    # Convert the 'Compounded_YoY' column to float
-    result[f'Compounded_YoY_{years}'] = result[f'Compounded_YoY_{years}'].astype(float)
+    buckets = max(budget // 2, 1)
+    size = -(-n // buckets)
+    grid = np.full(buckets * size, np.nan)
+    grid[:n] = values
+    grid = grid.reshape(buckets, size)
+    starts = np.arange(buckets) * size
+    lows = starts + np.where(np.isnan(grid), np.inf, grid).argmin(axis=1)
+    highs = starts + np.where(np.isnan(grid), -np.inf, grid).argmax(axis=1)
+
+    edges = np.flatnonzero(np.diff(np.isnan(values)))
+    indices = np.concatenate([[0, n - 1], lows, highs, edges, edges + 1])
+    return np.unique(indices[indices < n])
+
+#Indices to draw for the rows in window at full resolution (thinned only if they alone exceed the budget)
+#and the rest of the series thinned to the budget, so panning out still shows the whole line
+def visible_indices(values, window, budget):
+    start, stop, _ = window.indices(len(values))
+    detail = start + minmax_indices(values[start:stop], budget)
+    return np.union1d(minmax_indices(values, budget), detail)
 
-    return result
-    
 #Generates distinct colors to assign to each new line added to the chart
 def get_distinct_colors(n, start_hue=240):
     golden_angle = 137.5